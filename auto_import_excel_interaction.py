@@ -3,7 +3,22 @@ from dotenv import load_dotenv
 from datetime import datetime
 import pandas as pd
 import mysql.connector
-import sys
+from functools import partial
+from import_options import get_option, get_positional_args, has_flag, is_truncate
+from batch_insert import get_batch_size, insert_in_batches
+from grapari_cache import get_grapari_cache
+from bulk_load import bulk_load_frame
+from streaming_import import get_chunk_size, peak_rss_mb, stream_chunks
+from db_connection import get_connection
+from parallel_import import list_txt_files, run_parallel, skip_done_files, truncate_tables
+from import_manifest import begin_file, checkpoint, finish_file, lookup_file, reset_manifest, skip_rows
+from parsed_cache import read_parsed_csv
+from interaction_schema import read_dtypes
+from month_routing import ROUTE_TARGET, route_file
+from shadow_table import create_shadow, finish_shadow
+from rollup import reset_rollup, rollup_hook, rollup_swap_pairs
+from import_metrics import ImportMetrics, ProgressReporter, is_debug, timed
+from interaction_transform import insert_columns, get_reject_path, to_insert_frame, transform_interactions, write_rejects
 
 load_dotenv()
 
@@ -16,17 +31,44 @@ mysql_config = {
 
 location_project = os.getcwd()
 location_folder_txt = os.path.join(location_project, "file_txt")
+USAGE = "Usage: python auto_import_excel_interaction.py <parameter1 [Bulan]> <parameter2 [Tahun]> [truncate] [--batch-size N] [--bulk] [--stream] [--chunk-size N] [--reject-dir DIR] [--workers N] [--parse-cache] [--shadow] [--rollup] | --route-months [--create-tables] [--template-table T]"
+
 expected_columns = ["update_stamp", "msisdn", "brand", "unit_type", "unit_name", "area_name", "reg_name", "topic_reason_1", "topic_reason_2", "topic_result", "service", "app_id", "user_id", "employee_code", "employee_name", "notes"]
 
-def replace_nan(value, default_value='EMPTY'):
-    return default_value if pd.isna(value) else value
+def write_frame(conn, cursor, df, table_interaction, file_name, batch_size, bulk, before_commit=None, metrics=None, progress=None):
+    insert_query = f"""
+    INSERT INTO {table_interaction} (update_stamp, msisdn, brand, unit_type, unit_name, unit_name_final, area_name, reg_name, topic_reason_1, topic_reason_2, topic_result, service, app_id, user_id, employee_code, employee_name, notes, type_service)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+    insert_frame = to_insert_frame(df)
+    before_commit = rollup_hook(conn, df, table_interaction, before_commit)
+
+    def print_batch(rows):
+        for values in rows:
+            print(f"Success Insert : {values[1]}|{values[5]}|{values[11]}|{values[10]}")
 
-def read_file_txt(txt_location, file_name, truncate=False):
-    if len(sys.argv) < 3:
-        raise ValueError("Usage: python auto_import_excel_interaction.py <parameter1 [Bulan]> <parameter2 [Tahun]> [truncate]")
+    with timed(metrics, "insert", len(insert_frame)):
+        if bulk:
+            return bulk_load_frame(conn, insert_frame, table_interaction, insert_columns, label=f"[{file_name}] ", before_commit=before_commit)
+        rows = insert_frame.itertuples(index=False, name=None)
+        # Log per baris hanya untuk --debug; default-nya cukup progress berkala dari insert_in_batches
+        return insert_in_batches(
+            conn, cursor, insert_query, rows, batch_size, label=f"[{file_name}] ",
+            on_batch=print_batch if is_debug() else None, before_commit=before_commit, progress=progress
+        )
 
-    bulan = int(sys.argv[1])
-    tahun = int(sys.argv[2])
+def read_file_txt(txt_location, file_name, truncate=False, batch_size=None, bulk=None, stream=None, chunk_size=None, target_table=None):
+    args = get_positional_args()
+    if len(args) < 2:
+        raise ValueError(USAGE)
+
+    bulan = int(args[0])
+    tahun = int(args[1])
+    batch_size = batch_size or get_batch_size()
+    bulk = has_flag("bulk") if bulk is None else bulk
+    stream = has_flag("stream") if stream is None else stream
+    chunk_size = chunk_size or get_chunk_size()
     result_date = datetime(tahun, bulan, 1).strftime("%Y-%m-%d")
 
     if not bulan:
@@ -35,37 +77,40 @@ def read_file_txt(txt_location, file_name, truncate=False):
     if not tahun:
         raise ValueError("Parameter2 untuk Tahun tidak boleh kosong")
 
+    success = False
+    metrics = ImportMetrics(file_name)
     try:
-        df = pd.read_csv(txt_location, delimiter='~', dtype=str)
-    except pd.errors.EmptyDataError:
-        print(f"Error: Empty DataFrame in file {txt_location}")
-        return
-    except Exception as e:
-        print(f"Error reading file {txt_location}: {e}")
-        return
+        conn = get_connection(mysql_config, allow_local_infile=bulk)
+        cursor = conn.cursor()
+        # target_table dipakai mode --shadow (isi dimuat ke salinan tabel)
+        table_interaction = target_table or f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
 
-    missing_columns = set(expected_columns) - set(df.columns)
-    if missing_columns:
-        print(f"File: [{file_name}] Gagal Import Txt (Format Salah). Kolom yang diharapkan tidak ditemukan: {missing_columns}")
-        return
-    
-    if 'update_stamp' in df.columns:
-        for idx, value in enumerate(df['update_stamp']):
-            update_stamp = datetime.strptime(str(value), '%Y-%m-%d %H:%M:%S')
-            if update_stamp.year != tahun or update_stamp.month != bulan:
-                print(f"File: [{file_name}] Gagal Import Txt. Terdapat Bulan dan Tahun yang tidak sesuai pada Parameter")
-                return
+        # File yang sudah tercatat selesai di manifest dilewati tanpa parsing ulang
+        entry = lookup_file(conn, txt_location, file_name, table_interaction)
+        if entry['status'] == 'done' and not truncate:
+            print(f"File: [{file_name}] Sudah pernah diimport ke {table_interaction}, dilewati.")
+            return True
 
-    try:
-        df['update_stamp'] = pd.to_datetime(df['update_stamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-    except Exception as e:
-        print(f"Error converting 'update_stamp' to datetime: {e}")
-        return
+        try:
+            if stream:
+                # Mode streaming: header dibaca dulu, isi file dibaca per chunk saat import
+                df = pd.read_csv(txt_location, delimiter='~', dtype=str, nrows=0)
+            else:
+                with timed(metrics, "read_csv") as record:
+                    # Dengan --parse-cache hasil parse diambil dari cache per hash isi file
+                    df = read_parsed_csv(txt_location, entry['content_hash'], delimiter='~', dtype=read_dtypes())
+                    record['rows'] = len(df)
+        except pd.errors.EmptyDataError:
+            print(f"Error: Empty DataFrame in file {txt_location}")
+            return False
+        except Exception as e:
+            print(f"Error reading file {txt_location}: {e}")
+            return False
 
-    try:
-        conn = mysql.connector.connect(**mysql_config)
-        cursor = conn.cursor()
-        table_interaction = f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+        missing_columns = set(expected_columns) - set(df.columns)
+        if missing_columns:
+            print(f"File: [{file_name}] Gagal Import Txt (Format Salah). Kolom yang diharapkan tidak ditemukan: {missing_columns}")
+            return False
 
         if truncate:
             try:
@@ -75,53 +120,56 @@ def read_file_txt(txt_location, file_name, truncate=False):
                 print(f"Table {table_interaction} truncated successfully.")
             except Exception as e:
                 print(f"Error truncating table {table_interaction}: {e}")
-                return
+                return False
+            reset_manifest(conn, table_interaction)
+            reset_rollup(conn, table_interaction)
+            entry['rows_committed'] = 0
+
+        # Offset baris yang sudah ter-commit ikut disimpan di transaksi tiap batch,
+        # jadi file yang gagal di tengah jalan dilanjutkan dari batch terakhir
+        begin_file(conn, entry)
+        resume_from = entry['rows_committed']
+        if resume_from:
+            print(f"File: [{file_name}] Melanjutkan import setelah {resume_from} baris yang sudah tersimpan")
+
+        def save_checkpoint(batch_cursor, rows):
+            checkpoint(batch_cursor, entry, rows)
+
+        grapari_cache = get_grapari_cache(conn)
+        grapari_cache.reset_stats()
+
+        reject_path = get_reject_path(file_name)
+        if os.path.exists(reject_path):
+            os.remove(reject_path)
+
+        if stream:
+            written = 0
+            rejected = 0
+            reader = pd.read_csv(txt_location, delimiter='~', dtype=read_dtypes(), chunksize=chunk_size)
+            progress = None if bulk else ProgressReporter(f"[{file_name}] Progress insert: ")
+
+            def transform_chunk(chunk):
+                return transform_interactions(chunk, grapari_cache, bulan, tahun, metrics)
+
+            remaining_skip = resume_from
+            for chunk_number, (chunk, rejects) in enumerate(stream_chunks(reader, transform_chunk, metrics=metrics), start=1):
+                rejected += write_rejects(rejects, reject_path, append=True)
+                chunk, remaining_skip = skip_rows(chunk, remaining_skip)
+                if not chunk.empty:
+                    written += write_frame(conn, cursor, chunk, table_interaction, f"{file_name} chunk {chunk_number}", batch_size, bulk, save_checkpoint, metrics, progress)
+            print(f"[{file_name}] Streaming selesai: {written} baris (chunk size {chunk_size})")
+        else:
+            df, rejects = transform_interactions(df, grapari_cache, bulan, tahun, metrics)
+            rejected = write_rejects(rejects, reject_path)
+            df, _ = skip_rows(df, resume_from)
+            write_frame(conn, cursor, df, table_interaction, file_name, batch_size, bulk, save_checkpoint, metrics)
+
+        if rejected:
+            print(f"File: [{file_name}] {rejected} baris ditolak (Bulan/Tahun tidak sesuai Parameter atau update_stamp salah), lihat {reject_path}")
+        grapari_cache.report(label=f"[{file_name}] ")
+        finish_file(conn, entry)
+        success = True
 
-        for index, row in df.iterrows():
-            try:
-                cursor.execute("SELECT grapari_fix FROM ccap_m_mapping_grapari WHERE grapari_source = %s", (row['unit_name'],))
-                result = cursor.fetchone()
-                unit_name_final = result[0] if result else 'NOT FOUND'
-                cursor.nextset()
-            except Exception as e:
-                print(f"Error fetching unit_name_final for row {index}: {e}")
-                unit_name_final = 'NOT FOUND'
-                
-            msisdn = str(row['msisdn']) if not pd.isna(row['msisdn']) else ''
-            if not msisdn or msisdn == '':
-                type_service = None
-            elif msisdn.startswith('628'):
-                type_service = 'Telkomsel'
-            else:
-                type_service = 'Indihome'
-            
-            insert_query = f"""
-            INSERT INTO {table_interaction} (update_stamp, msisdn, brand, unit_type, unit_name, unit_name_final, area_name, reg_name, topic_reason_1, topic_reason_2, topic_result, service, app_id, user_id, employee_code, employee_name, notes, type_service)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_query, (
-                replace_nan(row['update_stamp']),
-                replace_nan(row['msisdn']),
-                replace_nan(row['brand']),
-                replace_nan(row['unit_type']),
-                replace_nan(row['unit_name']),
-                replace_nan(unit_name_final),
-                replace_nan(row['area_name']),
-                replace_nan(row['reg_name']),
-                replace_nan(row['topic_reason_1']),
-                replace_nan(row['topic_reason_2']),
-                replace_nan(row['topic_result']),
-                replace_nan(row['service']),
-                replace_nan(row['app_id']),
-                replace_nan(row['user_id']),
-                replace_nan(row['employee_code']),
-                replace_nan(row['employee_name']),
-                replace_nan(row['notes']),
-                replace_nan(type_service)
-            ))
-            conn.commit()
-            print(f"Success Insert : {row['msisdn']}|{unit_name_final}|{row['service']}|{row['topic_result']}")
-            
     except Exception as e:
         print(f"Error processing rows: {e}")
     except mysql.connector.Error as err:
@@ -131,15 +179,98 @@ def read_file_txt(txt_location, file_name, truncate=False):
             cursor.close()
             conn.close()
 
-    print(f"File: [{file_name}] Sukses Import Txt.")
+    metrics.report()
+    metrics.write_summary("success" if success else "failed")
+    if success:
+        print(f"File: [{file_name}] Sukses Import Txt.")
+    else:
+        print(f"File: [{file_name}] Gagal Import Txt.")
+    return success
+
+def route_file_txt(txt_location, file_name, truncate=False, batch_size=None, bulk=None):
+    # --route-months: file dibaca sekali dan tiap baris ditulis ke tabel bulan update_stamp-nya,
+    # bulan/tahun di command line tidak dipakai
+    batch_size = batch_size or get_batch_size()
+    bulk = has_flag("bulk") if bulk is None else bulk
+    success = False
+    metrics = ImportMetrics(file_name)
+    try:
+        conn = get_connection(mysql_config, allow_local_infile=bulk)
+        cursor = conn.cursor()
+
+        def write_partition(part, table, before_commit):
+            return write_frame(conn, cursor, part, table, file_name, batch_size, bulk, before_commit, metrics)
+
+        touched = route_file(conn, txt_location, file_name, expected_columns, write_partition, metrics)
+        success = touched is not None
+    except Exception as e:
+        print(f"Error processing rows: {e}")
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+    metrics.report()
+    metrics.write_summary("success" if success else "failed")
+    if success:
+        print(f"File: [{file_name}] Sukses Import Txt.")
+    else:
+        print(f"File: [{file_name}] Gagal Import Txt.")
+    return success
 
 if __name__ == "__main__":
-    truncate_flag = len(sys.argv) > 3 and sys.argv[3].lower() == "truncate"
+    truncate_flag = is_truncate()
+    workers = get_option("workers", 1, int)
+    route = has_flag("route-months")
+    import_file = route_file_txt if route else read_file_txt
 
     if not os.path.exists(location_folder_txt):
         print(f"Directory {location_folder_txt} does not exist.")
     else:
-        with os.scandir(location_folder_txt) as entries:
-            for entry in entries:
-                if entry.is_file() and entry.name.endswith('.txt') and not entry.name.startswith('~$'):
-                    read_file_txt(entry.path, entry.name, truncate=truncate_flag)
+        files = list_txt_files(location_folder_txt)
+        # Truncate sekali per run (bukan per file) supaya file yang sudah diimport tidak ikut terhapus
+        if truncate_flag and route:
+            raise ValueError("truncate tidak bisa digabung dengan --route-months")
+        if not route and len(get_positional_args()) < 2:
+            raise ValueError(USAGE)
+        shadow = None
+        if truncate_flag:
+            bulan, tahun = (int(arg) for arg in get_positional_args()[:2])
+            table_interaction = f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+            if has_flag("shadow"):
+                # Reload penuh lewat shadow: tabel asli tetap utuh dan terbaca sampai swap di akhir
+                conn = get_connection(mysql_config)
+                try:
+                    shadow, indexes = create_shadow(conn, table_interaction)
+                    reset_rollup(conn, shadow)
+                finally:
+                    conn.close()
+                import_file = partial(read_file_txt, target_table=shadow)
+            else:
+                truncate_tables(mysql_config, [table_interaction])
+                conn = get_connection(mysql_config)
+                try:
+                    reset_rollup(conn, table_interaction)
+                finally:
+                    conn.close()
+        elif not route:
+            # File yang sudah selesai disaring dengan satu SELECT manifest sebelum dibuka satu per satu
+            bulan, tahun = (int(arg) for arg in get_positional_args()[:2])
+            files = skip_done_files(mysql_config, files, f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}")
+        else:
+            files = skip_done_files(mysql_config, files, ROUTE_TARGET)
+        if workers > 1:
+            results = run_parallel(import_file, files, workers, mysql_config, allow_local_infile=has_flag("bulk"))
+        else:
+            results = {name: import_file(path, name) for path, name in files}
+        if shadow:
+            conn = get_connection(mysql_config)
+            try:
+                pairs = [(table_interaction, shadow, indexes)] + rollup_swap_pairs(conn, table_interaction, shadow)
+                finish_shadow(conn, pairs, results)
+            finally:
+                conn.close()
+
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"Peak RSS: {peak:.1f} MB")
@@ -2,8 +2,26 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import pandas as pd
-import mysql.connector
-import sys
+from functools import partial
+from import_options import get_option, get_positional_args, has_flag, is_truncate
+from batch_insert import get_batch_size, insert_in_batches
+from grapari_cache import get_grapari_cache
+from bulk_load import bulk_load_frame
+from streaming_import import get_chunk_size, peak_rss_mb, stream_chunks
+from db_connection import get_connection
+from parallel_import import ImportResult, list_txt_files, run_parallel, skip_done_files, truncate_tables
+from import_manifest import begin_file, checkpoint, finish_file, lookup_file, reset_manifest, skip_rows
+from parsed_cache import read_parsed_csv
+from interaction_schema import read_dtypes
+from month_routing import ROUTE_TARGET, ensure_table, merge_touched, month_tables, route_file
+from shadow_table import create_shadow, finish_shadow
+from rollup import reset_rollup, rollup_hook, rollup_swap_pairs
+from import_metrics import ImportMetrics, ProgressReporter, is_debug, timed
+from interaction_transform import insert_columns, get_reject_path, to_insert_frame, transform_interactions, write_rejects
+from unique_interaction import (
+    check_parity, get_last_id, is_table_empty, rebuild_unique_pandas, rebuild_unique_server_side,
+    update_unique_pandas, update_unique_server_side
+)
 
 load_dotenv()
 
@@ -16,6 +34,8 @@ mysql_config = {
 
 location_project = os.getcwd()
 location_folder_txt = os.path.join(location_project, "file_txt")
+USAGE = "Usage: python auto_import_excel_interaction.py <bulan> <tahun> [truncate] [--batch-size N] [--bulk] [--stream] [--chunk-size N] [--reject-dir DIR] [--server-side] [--full-rebuild] [--cek-parity] [--workers N] [--parse-cache] [--shadow] [--rollup] | --route-months [--create-tables] [--template-table T] [--template-unique-table T]"
+
 expected_columns = [
     "update_stamp", "msisdn", "brand", "unit_type", "unit_name",
     "area_name", "reg_name", "topic_reason_1", "topic_reason_2",
@@ -23,169 +43,311 @@ expected_columns = [
     "employee_code", "employee_name", "notes"
 ]
 
-def replace_nan(value, default_value='EMPTY'):
-    return default_value if pd.isna(value) else value
+def write_frame(conn, cursor, df, table_interaction, file_name, batch_size, bulk, before_commit=None, metrics=None, progress=None):
+    insert_query = f"""
+    INSERT INTO {table_interaction} (
+        update_stamp, msisdn, brand, unit_type, unit_name, unit_name_final,
+        area_name, reg_name, topic_reason_1, topic_reason_2, topic_result,
+        service, app_id, user_id, employee_code, employee_name, notes, type_service
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
 
-def read_file_txt(txt_location, file_name, truncate=False):
-    if len(sys.argv) < 3:
-        raise ValueError("Usage: python auto_import_excel_interaction.py <bulan> <tahun> [truncate]")
+    insert_frame = to_insert_frame(df)
+    before_commit = rollup_hook(conn, df, table_interaction, before_commit)
 
-    bulan = int(sys.argv[1])
-    tahun = int(sys.argv[2])
-    result_date = datetime(tahun, bulan, 1).strftime("%Y-%m-%d")
+    def print_batch(rows):
+        for values in rows:
+            print(f"Success Insert: {values[1]} | {values[5]} | {values[11]} | {values[10]}")
 
-    try:
-        df = pd.read_csv(txt_location, delimiter='~', dtype=str)
-    except pd.errors.EmptyDataError:
-        print(f"Error: Empty DataFrame in file {txt_location}")
-        return
-    except Exception as e:
-        print(f"Error reading file {txt_location}: {e}")
-        return
+    with timed(metrics, "insert", len(insert_frame)):
+        if bulk:
+            return bulk_load_frame(conn, insert_frame, table_interaction, insert_columns, label=f"[{file_name}] ", before_commit=before_commit)
+        rows = insert_frame.itertuples(index=False, name=None)
+        # Log per baris hanya untuk --debug; default-nya cukup progress berkala dari insert_in_batches
+        return insert_in_batches(
+            conn, cursor, insert_query, rows, batch_size, label=f"[{file_name}] ",
+            on_batch=print_batch if is_debug() else None, before_commit=before_commit, progress=progress
+        )
+
+def refresh_unique(conn, bulan, tahun, last_id, batch_size, server_side=False, full_rebuild=False, metrics=None, source_table=None, shadow=None, swap_with=()):
+    # ========== Proses Interaksi Unique ==========
+    # Proses ini mengambil semua data dari tabel bulan berjalan,
+    # lalu menentukan baris interaksi unik berdasarkan kombinasi msisdn + tanggal (update_date),
+    # dengan urutan prioritas topik yang sudah dikelompokkan dalam SERVICE_DETAIL dan PRIORITY.
+    # Dengan --server-side seluruh proses ini dijalankan di MySQL (ROW_NUMBER() OVER ...).
+    # Default-nya incremental: hanya key dari baris baru (id > last_id) yang dievaluasi ulang.
+    # Rebuild penuh dipakai saat truncate, --full-rebuild, atau tabel unique masih kosong.
+    # Dengan --shadow rebuild penuh ditulis ke salinan lalu ditukar (RENAME), tabel unique tidak pernah kosong;
+    # swap_with berisi shadow tabel interaksi yang ikut ditukar dalam RENAME yang sama.
+    default_table = f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+    table_interaction = source_table or default_table
+    unique_table = f"ccap_t_interaction_unique_{tahun}{str(bulan).zfill(2)}"
+    shadow = has_flag("shadow") if shadow is None else shadow
+    if full_rebuild or is_table_empty(conn, unique_table):
+        target, indexes = create_shadow(conn, unique_table) if shadow else (unique_table, None)
+        if server_side:
+            rebuild_unique_server_side(conn, table_interaction, target, metrics)
+        else:
+            rebuild_unique_pandas(conn, table_interaction, target, batch_size, metrics)
+        if shadow:
+            finish_shadow(conn, [(unique_table, target, indexes)] + list(swap_with), {})
+            table_interaction = default_table if swap_with else table_interaction
+    elif server_side:
+        update_unique_server_side(conn, table_interaction, unique_table, last_id, metrics)
+    else:
+        update_unique_pandas(conn, table_interaction, unique_table, last_id, batch_size, metrics)
+    print(f"✅ Sukses insert ke {unique_table}")
 
-    missing_columns = set(expected_columns) - set(df.columns)
-    if missing_columns:
-        print(f"File: [{file_name}] Gagal Import Txt. Kolom tidak ditemukan: {missing_columns}")
-        return
+    if has_flag("cek-parity"):
+        check_parity(conn, table_interaction)
 
-    try:
-        df['update_stamp'] = pd.to_datetime(df['update_stamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-    except Exception as e:
-        print(f"Error parsing update_stamp: {e}")
-        return
+def read_file_txt(txt_location, file_name, truncate=False, batch_size=None, bulk=None, stream=None, chunk_size=None, server_side=None, full_rebuild=None, unique=True, target_table=None):
+    args = get_positional_args()
+    if len(args) < 2:
+        raise ValueError(USAGE)
+
+    bulan = int(args[0])
+    tahun = int(args[1])
+    batch_size = batch_size or get_batch_size()
+    bulk = has_flag("bulk") if bulk is None else bulk
+    stream = has_flag("stream") if stream is None else stream
+    chunk_size = chunk_size or get_chunk_size()
+    server_side = has_flag("server-side") if server_side is None else server_side
+    full_rebuild = has_flag("full-rebuild") if full_rebuild is None else full_rebuild
+    result_date = datetime(tahun, bulan, 1).strftime("%Y-%m-%d")
 
+    success = False
+    resume_from = 0
+    metrics = ImportMetrics(file_name)
     try:
-        conn = mysql.connector.connect(**mysql_config)
+        conn = get_connection(mysql_config, allow_local_infile=bulk)
         cursor = conn.cursor()
-        table_interaction = f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+        # target_table dipakai mode --shadow (isi dimuat ke salinan tabel)
+        table_interaction = target_table or f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+
+        # File yang sudah tercatat selesai di manifest dilewati tanpa parsing ulang
+        entry = lookup_file(conn, txt_location, file_name, table_interaction)
+        if entry['status'] == 'done' and not truncate:
+            print(f"File: [{file_name}] Sudah pernah diimport ke {table_interaction}, dilewati.")
+            return True
+
+        try:
+            # Mode streaming hanya membaca header di sini, isi file dibaca per chunk saat import
+            with timed(metrics, "read_csv") as record:
+                if stream:
+                    df = pd.read_csv(txt_location, delimiter='~', dtype=str, nrows=0)
+                else:
+                    # Dengan --parse-cache hasil parse diambil dari cache per hash isi file
+                    df = read_parsed_csv(txt_location, entry['content_hash'], delimiter='~', dtype=read_dtypes())
+                record['rows'] = len(df)
+        except pd.errors.EmptyDataError:
+            print(f"Error: Empty DataFrame in file {txt_location}")
+            return False
+        except Exception as e:
+            print(f"Error reading file {txt_location}: {e}")
+            return False
+
+        missing_columns = set(expected_columns) - set(df.columns)
+        if missing_columns:
+            print(f"File: [{file_name}] Gagal Import Txt. Kolom tidak ditemukan: {missing_columns}")
+            return False
 
         if truncate:
             cursor.execute(f"TRUNCATE TABLE {table_interaction}")
             conn.commit()
+            reset_manifest(conn, table_interaction)
+            reset_rollup(conn, table_interaction)
+            entry['rows_committed'] = 0
 
-        for index, row in df.iterrows():
-            cursor.execute("SELECT grapari_fix FROM ccap_m_mapping_grapari WHERE grapari_source = %s", (row['unit_name'],))
-            result = cursor.fetchone()
-            unit_name_final = result[0] if result else 'NOT FOUND'
-            cursor.nextset()
-
-            msisdn = str(row['msisdn']) if not pd.isna(row['msisdn']) else ''
-            type_service = 'Telkomsel' if msisdn.startswith('628') else 'Indihome' if msisdn else None
-
-            insert_query = f"""
-            INSERT INTO {table_interaction} (
-                update_stamp, msisdn, brand, unit_type, unit_name, unit_name_final,
-                area_name, reg_name, topic_reason_1, topic_reason_2, topic_result,
-                service, app_id, user_id, employee_code, employee_name, notes, type_service
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_query, (
-                replace_nan(row['update_stamp']), replace_nan(row['msisdn']), replace_nan(row['brand']),
-                replace_nan(row['unit_type']), replace_nan(row['unit_name']), replace_nan(unit_name_final),
-                replace_nan(row['area_name']), replace_nan(row['reg_name']), replace_nan(row['topic_reason_1']),
-                replace_nan(row['topic_reason_2']), replace_nan(row['topic_result']), replace_nan(row['service']),
-                replace_nan(row['app_id']), replace_nan(row['user_id']), replace_nan(row['employee_code']),
-                replace_nan(row['employee_name']), replace_nan(row['notes']), replace_nan(type_service)
-            ))
-            conn.commit()
-            print(f"Success Insert: {row['msisdn']} | {unit_name_final} | {row['service']} | {row['topic_result']}")
+        # Offset baris yang sudah ter-commit ikut disimpan di transaksi tiap batch,
+        # jadi file yang gagal di tengah jalan dilanjutkan dari batch terakhir
+        begin_file(conn, entry)
+        resume_from = entry['rows_committed']
+        if resume_from:
+            print(f"File: [{file_name}] Melanjutkan import setelah {resume_from} baris yang sudah tersimpan")
+
+        def save_checkpoint(batch_cursor, rows):
+            checkpoint(batch_cursor, entry, rows)
+
+        last_id = get_last_id(conn, table_interaction)
+        grapari_cache = get_grapari_cache(conn)
+        grapari_cache.reset_stats()
+
+        reject_path = get_reject_path(file_name)
+        if os.path.exists(reject_path):
+            os.remove(reject_path)
+
+        if stream:
+            written = 0
+            rejected = 0
+            reader = pd.read_csv(txt_location, delimiter='~', dtype=read_dtypes(), chunksize=chunk_size)
+            progress = None if bulk else ProgressReporter(f"[{file_name}] Progress insert: ")
+
+            def transform_chunk(chunk):
+                return transform_interactions(chunk, grapari_cache, metrics=metrics)
+
+            remaining_skip = resume_from
+            for chunk_number, (chunk, rejects) in enumerate(stream_chunks(reader, transform_chunk, metrics=metrics), start=1):
+                rejected += write_rejects(rejects, reject_path, append=True)
+                chunk, remaining_skip = skip_rows(chunk, remaining_skip)
+                if not chunk.empty:
+                    written += write_frame(conn, cursor, chunk, table_interaction, f"{file_name} chunk {chunk_number}", batch_size, bulk, save_checkpoint, metrics, progress)
+            print(f"[{file_name}] Streaming selesai: {written} baris (chunk size {chunk_size})")
+        else:
+            df, rejects = transform_interactions(df, grapari_cache, metrics=metrics)
+            rejected = write_rejects(rejects, reject_path)
+            df, _ = skip_rows(df, resume_from)
+            write_frame(conn, cursor, df, table_interaction, file_name, batch_size, bulk, save_checkpoint, metrics)
+
+        if rejected:
+            print(f"File: [{file_name}] {rejected} baris ditolak (update_stamp salah), lihat {reject_path}")
+        grapari_cache.report(label=f"[{file_name}] ")
 
         print(f"File: [{file_name}] Sukses Import Txt.")
 
-        # ========== Proses Interaksi Unique ==========
-        # Proses ini mengambil semua data dari tabel bulan berjalan,
-        # lalu menentukan baris interaksi unik berdasarkan kombinasi msisdn + tanggal (update_date),
-        # dengan urutan prioritas topik yang sudah dikelompokkan dalam SERVICE_DETAIL dan PRIORITY.
-        
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(f"SELECT * FROM {table_interaction}")
-        rows = cursor.fetchall()
-        if rows:
-            df_all = pd.DataFrame(rows)
-            print("✅ Jumlah total baris awal:", len(df_all))
-            # Hitung jumlah baris unik berdasarkan kombinasi msisdn dan tanggal (berarti bisa lebih dari 1 per bulan)
-            print("✅ Jumlah nilai msisdn unik (berdasarkan tanggal):", df_all['msisdn'].nunique())
-            # Ambil hanya bagian tanggal dari update_stamp (tanpa waktu) untuk digunakan sebagai dasar pengelompokan harian
-            df_all['update_date'] = pd.to_datetime(df_all['update_stamp'], errors='coerce').dt.date
-
-
-            topic_to_service_detail = {
-                "P11-Permintaan Pasang Baru Telkomsel Halo": "P1",
-                "P11-Permintaan Penambahan Kontrak Pasang Baru Telkomsel Halo": "P1",
-                "P11-Permintaan Pasang Baru Telkomsel Halo Nomor Cantik": "P1",
-                "P15-Permintaan reestablish": "P1",
-                "P32-Permintaan Pre2Post Halo+": "P1",
-                "P32-Permintaan Post2Pre karena migrasi Halo+": "P1",
-                "P52-Permintaan perubahan kepemilikan": "P1",
-                "P52-Permintaan perubahan customer type": "P1",
-                "P52-Permintaan Perubahan Data Pelanggan": "P1",
-                "P58-Permintaan Migrasi Seamless P2P": "P1",
-                "P58-Permintaan Migrasi Pre to Post": "P1",
-                "P59-Permintaan Migrasi Post to Pre": "P1",
-                "P61-Permintaan aktivasi produk campaign": "P1",
-                "P71-Permintaan berhenti berlangganan": "P1",
-                "P13-Permintaan registrasi Prabayar": "P2",
-                "P13-Permintaan registrasi Prabayar WNA": "P2",
-                "P14-Permintaan Reaktivasi": "P2",
-                "P51-Ganti Kartu Karena Hilang": "P2",
-                "P51-Ganti Kartu Karena Hilang, Terdapat Fitur Banking": "P2",
-                "P51-Ganti Kartu Karena Rusak Akibat Penggunaan": "P2",
-                "P51-Ganti Kartu Karena Rusak Akibat Penggunaan, Terdapat Fitur Banking": "P2",
-                "P51-Ganti Kartu Karena Rusak Fabrikasi": "P2",
-                "P51-Ganti Kartu Untuk Reaktivasi": "P2",
-                "P51-Ganti Kartu Untuk Upgrade Kartu": "P2",
-                "P51-Ganti Kartu Online Untuk Upgrade 4G": "P2",
-                "P51-Ganti Kartu Online Karena Rusak/Hilang Online": "P2",
-                "P51-Ganti Kartu Online": "P2",
-                "P51-Permintaan Registrasi IMEI Roamer": "P2",
-                "P44-Permintaan pembayaran cicilan tagihan": "P44",
-                "P44-Permintaan pembayaran deposit": "P44",
-                "P44-Permintaan pembayaran tagihan": "P44"
-            }
-            priority_order = {'P1': 1, 'P44': 2, 'P2': 3, 'P': 4, 'K': 5, 'O': 6, 'I': 7, 'C': 8}
-            # Mapping topic_result ke SERVICE_DETAIL berdasarkan kamus topic_to_service_detail
-            # Jika tidak ditemukan, fallback ke nilai 'service' dari kolom data
-            # Kemudian dari SERVICE_DETAIL diekstrak prefix huruf (misal: P1, P44, P) lalu dipetakan ke PRIORITY
-            # Tujuannya untuk mengurutkan interaksi agar yang prioritas tinggi diproses lebih dulu saat pengambilan unique
-            df_all['SERVICE_DETAIL'] = df_all['topic_result'].map(topic_to_service_detail)
-            df_all['SERVICE_DETAIL'] = df_all['SERVICE_DETAIL'].fillna(df_all['service']).astype(str)
-            df_all['PRIORITY'] = df_all['SERVICE_DETAIL'].str.extract(r'^([A-Z]+\d*)')[0].map(
-                lambda x: priority_order.get(str(x) if str(x) in priority_order else str(x)[0] if pd.notna(x) and str(x) else None, 99)
-            )
-
-            df_sorted = df_all.sort_values(by='PRIORITY')
-            df_sorted['update_date'] = df_sorted['update_stamp'].dt.date
-            # Ambil satu interaksi unik per msisdn per hari berdasarkan update_date
-            # Jika ingin hanya satu interaksi per msisdn per bulan, cukup gunakan subset=['msisdn']
-            df_unique = df_sorted.drop_duplicates(subset=['msisdn', 'update_date'], keep='first')
-
-            unique_table = f"ccap_t_interaction_unique_{tahun}{str(bulan).zfill(2)}"
-            cursor.execute(f"TRUNCATE TABLE {unique_table}")
-            conn.commit()
-            cols = [col for col in df_unique.columns if col not in ['id', 'SERVICE_DETAIL', 'PRIORITY', 'update_date']]
-            placeholders = ", ".join(["%s"] * len(cols))
-            insert_stmt = f"INSERT INTO {unique_table} ({', '.join(cols)}) VALUES ({placeholders})"
+        # Baris dari percobaan sebelumnya (resume) punya id <= last_id, jadi unique di-rebuild penuh
+        if unique:
+            refresh_unique(conn, bulan, tahun, last_id, batch_size, server_side, full_rebuild or truncate or resume_from > 0, metrics)
+        finish_file(conn, entry)
+        success = True
 
-            for _, row in df_unique.iterrows():
-                values = tuple(row[col] for col in cols)
-                cursor.execute(insert_stmt, values)
-            conn.commit()
-            print(f"✅ Sukses insert ke {unique_table}")
+    except Exception as e:
+        print(f"Error processing rows: {e}")
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
+    metrics.report()
+    metrics.write_summary("success" if success else "failed")
+    # Tanpa unique (mode paralel) pemanggil perlu tahu file yang di-resume untuk memaksa rebuild penuh
+    return success if unique else ImportResult(success, resume_from > 0)
 
+def refresh_months(conn, touched, batch_size, server_side=False, full_rebuild=False, metrics=None):
+    # Unique hanya diproses untuk bulan yang benar-benar ditulis
+    for period, info in sorted(touched.items()):
+        _, unique_table = month_tables(period)
+        if not ensure_table(conn, unique_table, unique=True):
+            continue
+        refresh_unique(conn, int(period[4:]), int(period[:4]), info['last_id'], batch_size, server_side, full_rebuild or info['resumed'], metrics)
+
+def route_file_txt(txt_location, file_name, truncate=False, batch_size=None, bulk=None, server_side=None, full_rebuild=None, unique=True, touched=None):
+    # --route-months: file dibaca sekali dan tiap baris ditulis ke tabel bulan update_stamp-nya.
+    # Jika touched (dict) diberikan, bulan yang ditulis dikumpulkan ke sana dan unique diproses pemanggil.
+    batch_size = batch_size or get_batch_size()
+    bulk = has_flag("bulk") if bulk is None else bulk
+    server_side = has_flag("server-side") if server_side is None else server_side
+    full_rebuild = has_flag("full-rebuild") if full_rebuild is None else full_rebuild
+    success = False
+    metrics = ImportMetrics(file_name)
+    try:
+        conn = get_connection(mysql_config, allow_local_infile=bulk)
+        cursor = conn.cursor()
+
+        def write_partition(part, table, before_commit):
+            return write_frame(conn, cursor, part, table, file_name, batch_size, bulk, before_commit, metrics)
+
+        file_touched = route_file(conn, txt_location, file_name, expected_columns, write_partition, metrics)
+        if file_touched is not None:
+            print(f"File: [{file_name}] Sukses Import Txt.")
+            if touched is not None:
+                merge_touched(touched, file_touched)
+            elif unique:
+                refresh_months(conn, file_touched, batch_size, server_side, full_rebuild, metrics)
+            success = True
     except Exception as e:
         print(f"Error processing rows: {e}")
     finally:
         if 'conn' in locals() and conn.is_connected():
             cursor.close()
             conn.close()
+    metrics.report()
+    metrics.write_summary("success" if success else "failed")
+    return success
 
 if __name__ == "__main__":
-    truncate_flag = len(sys.argv) > 3 and sys.argv[3].lower() == "truncate"
+    truncate_flag = is_truncate()
+    workers = get_option("workers", 1, int)
+    route = has_flag("route-months")
 
     if not os.path.exists(location_folder_txt):
         print(f"Directory {location_folder_txt} does not exist.")
+    elif route:
+        if truncate_flag:
+            raise ValueError("truncate tidak bisa digabung dengan --route-months")
+        if workers > 1:
+            print("--route-months berjalan serial, --workers diabaikan")
+        # Semua file diimport dulu, lalu unique diproses sekali per bulan yang tersentuh
+        touched = {}
+        for path, name in skip_done_files(mysql_config, list_txt_files(location_folder_txt), ROUTE_TARGET):
+            route_file_txt(path, name, touched=touched)
+        conn = get_connection(mysql_config)
+        try:
+            refresh_months(conn, touched, get_batch_size(), has_flag("server-side"), has_flag("full-rebuild"))
+        finally:
+            conn.close()
     else:
-        with os.scandir(location_folder_txt) as entries:
-            for entry in entries:
-                if entry.is_file() and entry.name.endswith('.txt') and not entry.name.startswith('~$'):
-                    read_file_txt(entry.path, entry.name, truncate=truncate_flag)
\ No newline at end of file
+        files = list_txt_files(location_folder_txt)
+        if len(get_positional_args()) < 2:
+            raise ValueError(USAGE)
+        bulan, tahun = (int(arg) for arg in get_positional_args()[:2])
+        table_interaction = f"ccap_t_interaction_{tahun}{str(bulan).zfill(2)}"
+        # Truncate sekali per run (bukan per file); tabel unique ikut dikosongkan
+        # sehingga file pertama memicu rebuild penuh
+        shadow = None
+        if truncate_flag and has_flag("shadow"):
+            conn = get_connection(mysql_config)
+            try:
+                shadow, indexes = create_shadow(conn, table_interaction)
+                reset_rollup(conn, shadow)
+            finally:
+                conn.close()
+        elif truncate_flag:
+            truncate_tables(mysql_config, [table_interaction, f"ccap_t_interaction_unique_{tahun}{str(bulan).zfill(2)}"])
+            conn = get_connection(mysql_config)
+            try:
+                reset_rollup(conn, table_interaction)
+            finally:
+                conn.close()
+        else:
+            files = skip_done_files(mysql_config, files, table_interaction)
+
+        if shadow:
+            # Interaksi dimuat ke shadow, unique dibangun penuh dari shadow,
+            # lalu tabel interaksi dan unique ditukar dalam satu RENAME TABLE
+            import_file = partial(read_file_txt, unique=False, target_table=shadow)
+            if workers > 1:
+                results = run_parallel(import_file, files, workers, mysql_config, allow_local_infile=has_flag("bulk"))
+            else:
+                results = {name: import_file(path, name) for path, name in files}
+            conn = get_connection(mysql_config)
+            try:
+                pairs = [(table_interaction, shadow, indexes)] + rollup_swap_pairs(conn, table_interaction, shadow)
+                if all(results.values()):
+                    refresh_unique(
+                        conn, bulan, tahun, 0, get_batch_size(), has_flag("server-side"), True,
+                        source_table=shadow, shadow=True, swap_with=pairs
+                    )
+                else:
+                    finish_shadow(conn, pairs, results)
+            finally:
+                conn.close()
+        elif workers > 1:
+            # Mode paralel: import per file di worker, lalu proses unique sekali setelah semua file selesai
+            conn = get_connection(mysql_config)
+            try:
+                last_id = get_last_id(conn, table_interaction)
+                resumed = set()
+                run_parallel(partial(read_file_txt, unique=False), files, workers, mysql_config, resumed=resumed, allow_local_infile=has_flag("bulk"))
+                # Baris file yang di-resume sudah ter-commit di run sebelumnya (id <= last_id), jadi rebuild penuh
+                if resumed:
+                    print(f"{len(resumed)} file dilanjutkan dari checkpoint, unique di-rebuild penuh")
+                refresh_unique(conn, bulan, tahun, last_id, get_batch_size(), has_flag("server-side"), has_flag("full-rebuild") or bool(resumed))
+            finally:
+                conn.close()
+        else:
+            for path, name in files:
+                read_file_txt(path, name)
+
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB")
@@ -0,0 +1,60 @@
+import os
+import time
+from import_options import get_option
+from import_metrics import ProgressReporter, is_debug
+
+
+def get_batch_size():
+    # Urutan: --batch-size di command line, lalu IMPORT_BATCH_SIZE di .env, default 5000
+    batch_size = get_option("batch-size", int(os.getenv("IMPORT_BATCH_SIZE", 5000)), int)
+    if batch_size < 1:
+        raise ValueError("Batch size harus lebih besar dari 0")
+    return batch_size
+
+
+def write_batch(conn, cursor, insert_query, rows, batch_number, label="", before_commit=None):
+    # Satu batch = satu executemany (multi-row VALUES) + satu commit
+    if not rows:
+        return 0
+    try:
+        cursor.executemany(insert_query, rows)
+        if before_commit:
+            before_commit(cursor, len(rows))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if is_debug():
+        print(f"{label}Batch {batch_number}: {len(rows)} baris ditulis")
+    return len(rows)
+
+
+def insert_in_batches(conn, cursor, insert_query, rows, batch_size=None, label="", on_batch=None, before_commit=None, progress=None):
+    batch_size = batch_size or get_batch_size()
+    progress = progress or ProgressReporter(f"{label}Progress insert: ")
+    start = time.perf_counter()
+    batch = []
+    batch_number = 0
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            batch_number += 1
+            total += write_batch(conn, cursor, insert_query, batch, batch_number, label, before_commit)
+            progress.update(len(batch))
+            if on_batch:
+                on_batch(batch)
+            batch = []
+
+    if batch:
+        batch_number += 1
+        total += write_batch(conn, cursor, insert_query, batch, batch_number, label, before_commit)
+        progress.update(len(batch))
+        if on_batch:
+            on_batch(batch)
+
+    progress.done()
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"{label}Total {total} baris ditulis dalam {batch_number} batch ({elapsed:.2f} detik, {rate:.0f} baris/detik)")
+    return total
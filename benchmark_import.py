@@ -0,0 +1,239 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from batch_insert import insert_in_batches
+from grapari_cache import GrapariCache, normalize_key
+from import_metrics import ImportMetrics
+from import_options import get_option, has_flag
+from interaction_transform import TIMESTAMP_FORMAT, insert_columns, to_insert_frame, transform_interactions
+from interaction_schema import compact_frame, read_dtypes, to_db_rows
+from streaming_import import current_rss_mb, peak_rss_mb
+from priority_classifier import get_classifier
+from unique_interaction import HELPER_COLUMNS, add_priority, select_unique
+
+expected_columns = [
+    "update_stamp", "msisdn", "brand", "unit_type", "unit_name",
+    "area_name", "reg_name", "topic_reason_1", "topic_reason_2",
+    "topic_result", "service", "app_id", "user_id",
+    "employee_code", "employee_name", "notes"
+]
+
+# Distribusi kasar mengikuti export CRM: mayoritas nomor Telkomsel (628xx),
+# sebagian nomor Indihome, sedikit msisdn kosong
+TELKOMSEL_PREFIXES = ['62811', '62812', '62813', '62821', '62822', '62852', '62853']
+INDIHOME_PREFIXES = ['1220', '1310', '1410', '0215', '0227']
+SERVICES = ['P', 'K', 'O', 'I', 'C']
+SERVICE_WEIGHTS = [0.35, 0.2, 0.15, 0.2, 0.1]
+OTHER_TOPICS = {
+    'K': ["K11-Keluhan Jaringan Data", "K12-Keluhan Sinyal", "K21-Keluhan Tagihan", "K31-Keluhan Paket"],
+    'O': ["O11-Order Paket Data", "O12-Order Roaming", "O21-Order Nomor Cantik"],
+    'I': ["I11-Informasi Tagihan", "I12-Informasi Paket", "I13-Informasi Promo", "I21-Informasi Produk"],
+    'C': ["C11-Komplain Layanan", "C12-Komplain Petugas"],
+    'P': ["P21-Permintaan Unreg Paket", "P22-Permintaan Cetak Tagihan", "P31-Permintaan PUK"],
+}
+BRANDS = ['Halo', 'simPATI', 'Kartu As', 'Loop', 'by.U', 'IndiHome']
+REGIONS = ['SUMBAGUT', 'SUMBAGTENG', 'SUMBAGSEL', 'JABOTABEK', 'JABAR', 'JATENG', 'JATIM', 'BALINUSRA', 'KALIMANTAN', 'SULAWESI', 'PUMA']
+
+
+def generate_interaction_file(path, rows=100000, bulan=5, tahun=2025, unit_names=300, msisdn_ratio=0.35,
+                              bad_stamp_ratio=0.001, seed=42):
+    rng = np.random.default_rng(seed)
+
+    # msisdn diambil dari pool supaya ada duplikat per hari (bahan uji dedup)
+    pool_size = max(1, int(rows * msisdn_ratio))
+    pool_kind = rng.choice(3, size=pool_size, p=[0.72, 0.24, 0.04])
+    pool = np.where(
+        pool_kind == 0,
+        np.char.add(rng.choice(TELKOMSEL_PREFIXES, pool_size), rng.integers(10**6, 10**8, pool_size).astype(str)),
+        np.char.add(rng.choice(INDIHOME_PREFIXES, pool_size), rng.integers(10**7, 10**8, pool_size).astype(str)),
+    ).astype(object)
+    pool[pool_kind == 2] = None
+    msisdn = pool[rng.zipf(1.3, rows) % pool_size]
+
+    start = datetime(tahun, bulan, 1)
+    days = pd.Period(start, 'M').days_in_month
+    seconds = rng.integers(0, days * 86400, rows)
+    stamps = (pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')).strftime(TIMESTAMP_FORMAT).to_numpy(dtype=object)
+    bad = rng.random(rows) < bad_stamp_ratio
+    stamps[bad] = 'invalid'
+
+    units = np.array([f"GraPARI {REGIONS[i % len(REGIONS)].title()} {i:03d}" for i in range(unit_names)], dtype=object)
+    unit_idx = np.minimum(rng.zipf(1.5, rows) - 1, unit_names - 1)
+
+    # ~30% topik ada di aturan topic_to_service_detail, sisanya topik lain dengan kode service
+    mapped_topics = np.array(list(get_classifier().topic_to_service_detail), dtype=object)
+    service = rng.choice(SERVICES, rows, p=SERVICE_WEIGHTS).astype(object)
+    topic = np.empty(rows, dtype=object)
+    use_mapped = rng.random(rows) < 0.3
+    topic[use_mapped] = rng.choice(mapped_topics, int(use_mapped.sum()))
+    service[use_mapped] = 'P'
+    for code, topics in OTHER_TOPICS.items():
+        mask = ~use_mapped & (service == code)
+        topic[mask] = rng.choice(np.array(topics, dtype=object), int(mask.sum()))
+
+    df = pd.DataFrame({
+        "update_stamp": stamps,
+        "msisdn": msisdn,
+        "brand": rng.choice(BRANDS, rows),
+        "unit_type": rng.choice(['GraPARI', 'GeraiHalo', 'Plasa Telkom'], rows, p=[0.7, 0.2, 0.1]),
+        "unit_name": units[unit_idx],
+        "area_name": np.char.add('AREA ', (unit_idx % 4 + 1).astype(str)),
+        "reg_name": np.array(REGIONS, dtype=object)[unit_idx % len(REGIONS)],
+        "topic_reason_1": [t.split('-', 1)[0] for t in topic],
+        "topic_reason_2": [t.split('-', 1)[-1] for t in topic],
+        "topic_result": topic,
+        "service": service,
+        "app_id": rng.choice(['CRM', 'MYTSEL', 'VERONIKA'], rows),
+        "user_id": np.char.add('user', rng.integers(1, 2000, rows).astype(str)),
+        "employee_code": np.char.add('EMP', rng.integers(10000, 99999, rows).astype(str)),
+        "employee_name": np.char.add('Petugas ', rng.integers(1, 2000, rows).astype(str)),
+        "notes": np.where(rng.random(rows) < 0.6, 'Pelanggan dilayani sesuai prosedur', None),
+    }, columns=expected_columns)
+    df.to_csv(path, sep='~', index=False)
+    return units
+
+
+def create_sqlite_tables(conn, table_interaction, unique_table):
+    column_defs = ", ".join(f"{col} TEXT" for col in insert_columns)
+    for table in (table_interaction, unique_table):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})")
+    conn.commit()
+
+
+def stage_result(name, rows, seconds, rss_before):
+    # Memori dari selisih RSS saat ini sebelum/sesudah stage (bukan tracemalloc, yang memperlambat
+    # stage yang diukur, dan bukan ru_maxrss, yang tidak berubah selama di bawah puncak sebelumnya)
+    rss_after = current_rss_mb()
+    return {
+        'stage': name,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows / seconds) if rows and seconds > 0 else None,
+        'rss_mb': round(rss_after, 1) if rss_after is not None else None,
+        'rss_growth_mb': round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None,
+    }
+
+
+def run_stage(results, name, func, rows=None):
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    value = func()
+    elapsed = time.perf_counter() - start
+    count = rows(value) if callable(rows) else rows
+    results.append(stage_result(name, count, elapsed, rss_before))
+    return value
+
+
+def run_benchmark(txt_location, unit_names, bulan, tahun, batch_size, db_path):
+    results = []
+    table_interaction = "ccap_t_interaction_bench"
+    unique_table = "ccap_t_interaction_unique_bench"
+
+    df = run_stage(results, "parse", lambda: pd.read_csv(txt_location, delimiter='~', dtype=read_dtypes()), rows=len)
+
+    # Stand-in ccap_m_mapping_grapari: ~95% unit_name punya mapping
+    if unit_names is None:
+        unit_names = df['unit_name'].dropna().astype(str).unique()
+    cache = GrapariCache(ttl=0)
+    cache.mapping = {normalize_key(name): f"GRAPARI {i:03d}" for i, name in enumerate(unit_names) if i % 20}
+
+    # Validasi dan mapping memakai transform_interactions yang sama dengan import, waktunya dari ImportMetrics.
+    # RSS hanya bisa diukur untuk transform_interactions secara utuh, dicatat di baris validate.
+    metrics = ImportMetrics("bench")
+    rss_before = current_rss_mb()
+    valid, _ = transform_interactions(df, cache, bulan, tahun, metrics)
+    results.append(stage_result("validate", metrics.stages["validation"]['rows'], metrics.stages["validation"]['seconds'], rss_before))
+    results.append(stage_result("grapari mapping", metrics.stages["mapping lookup"]['rows'], metrics.stages["mapping lookup"]['seconds'], None))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        create_sqlite_tables(conn, table_interaction, unique_table)
+        cursor = conn.cursor()
+        insert_query = f"INSERT INTO {table_interaction} ({', '.join(insert_columns)}) VALUES ({', '.join(['?'] * len(insert_columns))})"
+
+        def insert():
+            rows = to_insert_frame(valid).itertuples(index=False, name=None)
+            return insert_in_batches(conn, cursor, insert_query, rows, batch_size, label="[bench] ")
+        run_stage(results, "insert", insert, rows=lambda written: written)
+
+        df_all = compact_frame(pd.read_sql(f"SELECT * FROM {table_interaction}", conn))
+        df_unique = run_stage(results, "unique dedup", lambda: select_unique(add_priority(df_all)), rows=len(df_all))
+
+        cols = [col for col in df_unique.columns if col not in HELPER_COLUMNS]
+        unique_query = f"INSERT INTO {unique_table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})"
+
+        def unique_insert():
+            rows = to_db_rows(df_unique, cols)
+            return insert_in_batches(conn, cursor, unique_query, rows, batch_size, label="[bench unique] ")
+        run_stage(results, "unique insert", unique_insert, rows=lambda written: written)
+    finally:
+        conn.close()
+    return results
+
+
+def print_results(results):
+    print(f"\n{'stage':<18}{'rows':>12}{'detik':>10}{'baris/detik':>14}{'RSS +MB':>10}{'RSS MB':>10}")
+    for r in results:
+        rate = f"{r['rows_per_sec']:,}" if r['rows_per_sec'] else '-'
+        growth = f"{r['rss_growth_mb']:.1f}" if r['rss_growth_mb'] is not None else '-'
+        rss = f"{r['rss_mb']:.1f}" if r['rss_mb'] is not None else '-'
+        print(f"{r['stage']:<18}{r['rows']:>12,}{r['seconds']:>10.3f}{rate:>14}{growth:>10}{rss:>10}")
+    total = sum(r['seconds'] for r in results)
+    print(f"{'total':<18}{results[0]['rows']:>12,}{total:>10.3f}")
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB")
+
+
+if __name__ == "__main__":
+    # python benchmark_import.py [--rows N] [--units N] [--seed N] [--batch-size N] [--file path] [--keep] [--history file.jsonl]
+    # --file: file yang sudah ada dibenchmark tanpa generate; jika belum ada, data sintetis ditulis ke sana
+    rows = get_option("rows", 100000, int)
+    units = get_option("units", 300, int)
+    seed = get_option("seed", 42, int)
+    batch_size = get_option("batch-size", 5000, int)
+    bulan, tahun = 5, 2025
+
+    workdir = tempfile.mkdtemp(prefix="bench_interaction_")
+    db_path = os.path.join(workdir, "bench.sqlite")
+    txt_location = get_option("file")
+    if txt_location and os.path.exists(txt_location):
+        # File export yang sudah ada dibenchmark apa adanya (tidak pernah ditimpa data sintetis);
+        # periodenya tidak diketahui, jadi hanya update_stamp yang rusak yang ditolak
+        print(f"Benchmark file yang sudah ada: {txt_location}")
+        unit_names = None
+        bulan, tahun = None, None
+    else:
+        txt_location = txt_location or os.path.join(workdir, f"interaction_bench_{rows}.txt")
+        print(f"Generate {rows:,} baris ke {txt_location} ({units} unit_name, seed {seed})")
+        unit_names = generate_interaction_file(txt_location, rows=rows, bulan=bulan, tahun=tahun, unit_names=units, seed=seed)
+
+    results = run_benchmark(txt_location, unit_names, bulan, tahun, batch_size, db_path)
+    print_results(results)
+
+    history = get_option("history")
+    if history:
+        with open(history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'rows': rows, 'units': units, 'seed': seed, 'batch_size': batch_size,
+                'python': sys.version.split()[0], 'pandas': pd.__version__,
+                'peak_rss_mb': peak_rss_mb(), 'stages': results,
+            }) + "\n")
+        print(f"Hasil ditambahkan ke {history}")
+
+    if not has_flag("keep"):
+        for path in (txt_location, db_path):
+            if path.startswith(workdir) and os.path.exists(path):
+                os.remove(path)
+        if not os.listdir(workdir):
+            os.rmdir(workdir)
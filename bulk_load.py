@@ -0,0 +1,56 @@
+import csv
+import os
+import tempfile
+import time
+
+
+def write_bulk_file(frame, columns):
+    # File sementara berformat sama dengan export (~), siap untuk LOAD DATA
+    tmp = tempfile.NamedTemporaryFile(
+        mode='w', suffix='.txt', prefix='bulk_', delete=False,
+        dir=os.getenv('BULK_TMP_DIR') or None, encoding='utf-8', newline=''
+    )
+    with tmp:
+        frame[columns].to_csv(
+            tmp, sep='~', header=False, index=False, lineterminator='\n',
+            quoting=csv.QUOTE_MINIMAL, quotechar='"', date_format='%Y-%m-%d %H:%M:%S'
+        )
+    return tmp.name
+
+
+def bulk_load_frame(conn, frame, table, columns, label="", before_commit=None):
+    start = time.perf_counter()
+    staging_table = f"stg_{table}"
+    column_list = ", ".join(columns)
+    bulk_file = write_bulk_file(frame, columns)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_table}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging_table} LIKE {table}")
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '~' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n' ({column_list})",
+            (bulk_file,)
+        )
+        loaded = cursor.rowcount
+        cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_table}")
+        inserted = cursor.rowcount
+        if before_commit:
+            before_commit(cursor, inserted)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_table}")
+        finally:
+            cursor.close()
+            os.remove(bulk_file)
+
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed > 0 else 0
+    print(f"{label}Bulk load: {loaded} baris ke {staging_table}, {inserted} baris ke {table} "
+          f"dalam {elapsed:.2f} detik ({rate:.0f} baris/detik)")
+    return inserted
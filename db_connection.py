@@ -0,0 +1,19 @@
+import mysql.connector
+from mysql.connector import pooling
+
+_pool = None
+
+
+def init_pool(config, pool_size=1, connect_kwargs=None):
+    # Dipanggil sekali per proses worker: koneksi dibuka sekali lalu dipakai ulang antar file
+    global _pool
+    _pool = pooling.MySQLConnectionPool(
+        pool_name="interaction_import", pool_size=pool_size, **config, **(connect_kwargs or {})
+    )
+
+
+def get_connection(config, **connect_kwargs):
+    # Tanpa pool: koneksi baru seperti biasa. Dengan pool: close() mengembalikan koneksi ke pool.
+    if _pool is not None:
+        return _pool.get_connection()
+    return mysql.connector.connect(**config, **connect_kwargs)
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from import_options import get_option, has_flag
+
+NOT_FOUND = 'NOT FOUND'
+
+
+def normalize_key(value):
+    # Query lama memakai collation _ci MySQL, jadi pencocokan dibuat case-insensitive
+    # dan mengabaikan spasi di belakang
+    return str(value).rstrip().lower()
+
+
+class GrapariCache:
+    def __init__(self, ttl=3600, snapshot_path=None):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.mapping = {}
+        self.loaded_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def is_expired(self):
+        return self.loaded_at is None or (self.ttl > 0 and time.time() - self.loaded_at > self.ttl)
+
+    def load_from_db(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT grapari_source, grapari_fix FROM ccap_m_mapping_grapari")
+            mapping = {}
+            for source, fix in cursor.fetchall():
+                if source is None:
+                    continue
+                # Sama seperti fetchone() pada query lama: baris pertama yang menang
+                mapping.setdefault(normalize_key(source), fix)
+        finally:
+            cursor.close()
+        self.mapping = mapping
+        self.loaded_at = time.time()
+        print(f"Mapping grapari dimuat dari database: {len(mapping)} entri")
+        self.save_snapshot()
+
+    def load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Snapshot grapari {self.snapshot_path} tidak bisa dibaca: {e}")
+            return False
+        if self.ttl > 0 and time.time() - snapshot['loaded_at'] > self.ttl:
+            return False
+        self.mapping = snapshot['mapping']
+        self.loaded_at = snapshot['loaded_at']
+        print(f"Mapping grapari dimuat dari snapshot {self.snapshot_path}: {len(self.mapping)} entri")
+        return True
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'loaded_at': self.loaded_at, 'mapping': self.mapping}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def refresh(self, conn, force=False):
+        if not force and not self.is_expired():
+            return
+        if not force and self.load_snapshot():
+            return
+        self.load_from_db(conn)
+
+    def reset_stats(self):
+        # Cache hidup selama proses (worker/daemon), hit/miss dihitung ulang per file
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, unit_names):
+        # Satu lookup vektor untuk seluruh kolom unit_name
+        if isinstance(unit_names.dtype, pd.CategoricalDtype):
+            # Kolom kategori: mapping cukup per kategori lalu disebar lewat kode (-1/NaN ke slot terakhir)
+            categories = pd.Series(unit_names.cat.categories.astype(object))
+            per_category = categories.str.rstrip().str.lower().map(self.mapping).to_numpy(dtype=object)
+            result = pd.Series(np.append(per_category, None).take(unit_names.cat.codes.to_numpy()), index=unit_names.index)
+        else:
+            keys = unit_names.where(unit_names.isna(), unit_names.astype(str).str.rstrip().str.lower())
+            result = keys.map(self.mapping)
+        found = int(result.notna().sum())
+        self.hits += found
+        self.misses += len(result) - found
+        return result.astype(object).where(result.notna(), NOT_FOUND)
+
+    def report(self, label=""):
+        print(f"{label}Grapari cache: {self.hits} hit, {self.misses} miss ({len(self.mapping)} entri)")
+
+
+_cache = None
+
+
+def get_grapari_cache(conn):
+    # Satu cache per proses; dimuat ulang hanya jika TTL habis atau --refresh-grapari
+    global _cache
+    if _cache is None:
+        _cache = GrapariCache(
+            ttl=get_option("grapari-ttl", int(os.getenv("GRAPARI_CACHE_TTL", 3600)), int),
+            snapshot_path=get_option("grapari-snapshot", os.getenv("GRAPARI_SNAPSHOT")),
+        )
+        _cache.refresh(conn, force=has_flag("refresh-grapari"))
+    else:
+        _cache.refresh(conn)
+    return _cache
@@ -0,0 +1,146 @@
+import hashlib
+import os
+
+MANIFEST_TABLE = "ccap_t_import_manifest"
+
+_ready = set()
+
+
+def ensure_manifest_table(conn):
+    # Cukup sekali per koneksi/proses
+    if MANIFEST_TABLE in _ready:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            content_hash CHAR(64) NOT NULL,
+            target_table VARCHAR(64) NOT NULL,
+            file_name VARCHAR(255) NOT NULL,
+            file_size BIGINT NOT NULL,
+            file_mtime DOUBLE NOT NULL,
+            rows_committed BIGINT NOT NULL DEFAULT 0,
+            status VARCHAR(16) NOT NULL DEFAULT 'running',
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, target_table),
+            KEY idx_manifest_file (target_table, file_name)
+        )
+        """)
+        conn.commit()
+    finally:
+        cursor.close()
+    _ready.add(MANIFEST_TABLE)
+
+
+def content_hash(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def done_files(conn, target_table):
+    # (nama, ukuran, mtime) semua file yang sudah selesai untuk tabel tujuan, dalam satu SELECT
+    ensure_manifest_table(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT file_name, file_size, file_mtime FROM {MANIFEST_TABLE} WHERE target_table = %s AND status = 'done'",
+            (target_table,)
+        )
+        return set(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def lookup_file(conn, path, file_name, target_table, file_hash=None):
+    # Jalur cepat: nama + ukuran + mtime sama dengan entri manifest -> tidak perlu hash ulang.
+    # Hash isi file hanya dihitung untuk file baru atau yang berubah (atau diambil dari file_hash).
+    ensure_manifest_table(conn)
+    stat = os.stat(path)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT content_hash, rows_committed, status FROM {MANIFEST_TABLE} "
+            f"WHERE target_table = %s AND file_name = %s AND file_size = %s AND file_mtime = %s",
+            (target_table, file_name, stat.st_size, stat.st_mtime)
+        )
+        entry = cursor.fetchone()
+        if entry is None:
+            file_hash = file_hash or content_hash(path)
+            cursor.execute(
+                f"SELECT content_hash, rows_committed, status FROM {MANIFEST_TABLE} "
+                f"WHERE content_hash = %s AND target_table = %s",
+                (file_hash, target_table)
+            )
+            entry = cursor.fetchone() or {'content_hash': file_hash, 'rows_committed': 0, 'status': 'new'}
+    finally:
+        cursor.close()
+    entry.update(file_name=file_name, file_size=stat.st_size, file_mtime=stat.st_mtime, target_table=target_table)
+    return entry
+
+
+def begin_file(conn, entry):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"INSERT INTO {MANIFEST_TABLE} (content_hash, target_table, file_name, file_size, file_mtime, rows_committed, status) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, 'running') "
+            f"ON DUPLICATE KEY UPDATE file_name = VALUES(file_name), file_size = VALUES(file_size), "
+            f"file_mtime = VALUES(file_mtime), rows_committed = VALUES(rows_committed), status = 'running'",
+            (entry['content_hash'], entry['target_table'], entry['file_name'], entry['file_size'],
+             entry['file_mtime'], entry['rows_committed'])
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def checkpoint(cursor, entry, rows):
+    # Dipanggil sebelum commit tiap batch: offset tersimpan di transaksi yang sama dengan datanya
+    cursor.execute(
+        f"UPDATE {MANIFEST_TABLE} SET rows_committed = rows_committed + %s "
+        f"WHERE content_hash = %s AND target_table = %s",
+        (rows, entry['content_hash'], entry['target_table'])
+    )
+
+
+def finish_file(conn, entry):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"UPDATE {MANIFEST_TABLE} SET status = 'done' WHERE content_hash = %s AND target_table = %s",
+            (entry['content_hash'], entry['target_table'])
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def reset_manifest(conn, target_table):
+    # Setelah TRUNCATE semua file untuk tabel tersebut harus diimport ulang
+    ensure_manifest_table(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE target_table = %s", (target_table,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def rename_manifest(conn, old_table, new_table):
+    # Setelah swap shadow -> tabel asli, entri manifest ikut dipindah
+    ensure_manifest_table(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"UPDATE {MANIFEST_TABLE} SET target_table = %s WHERE target_table = %s", (new_table, old_table))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def skip_rows(df, remaining):
+    # Lewati baris yang sudah ter-commit pada percobaan sebelumnya (resume)
+    skipped = min(remaining, len(df))
+    return df.iloc[skipped:], remaining - skipped
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from import_options import get_option, has_flag
+
+
+def is_debug():
+    # Log per baris ("Success Insert ...") hanya ditampilkan dengan --debug
+    return has_flag("debug")
+
+
+class ImportMetrics:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.started_at = time.time()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, rows=0):
+        # Dipanggil dari thread reader (streaming) maupun thread utama, jadi dikunci
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0, 'calls': 0})
+            stage['seconds'] += seconds
+            stage['rows'] += rows or 0
+            stage['calls'] += 1
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        record = {'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(name, time.perf_counter() - start, record['rows'])
+
+    def summary(self):
+        wall = time.time() - self.started_at
+        stages = {}
+        for name, stage in self.stages.items():
+            rate = stage['rows'] / stage['seconds'] if stage['seconds'] > 0 else None
+            stages[name] = dict(stage, seconds=round(stage['seconds'], 4), rows_per_sec=round(rate) if rate else None)
+        return {'file': self.file_name, 'wall_seconds': round(wall, 3), 'stages': stages}
+
+    def report(self):
+        summary = self.summary()
+        print(f"[{self.file_name}] Ringkasan waktu ({summary['wall_seconds']:.2f} detik total):")
+        for name, stage in summary['stages'].items():
+            rate = f"{stage['rows_per_sec']:,} baris/detik" if stage['rows_per_sec'] else "-"
+            print(f"  {name:<16} {stage['rows']:>12,} baris  {stage['seconds']:>9.2f} detik  {rate}")
+        return summary
+
+    def write_summary(self, status):
+        metrics_dir = get_option("metrics-dir", os.path.join(os.getcwd(), "file_metrics"))
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"{os.path.splitext(self.file_name)[0]}.metrics.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.summary(), status=status), f, indent=2)
+        return path
+
+
+def timed(metrics, name, rows=0):
+    return metrics.stage(name, rows) if metrics else nullcontext({'rows': rows})
+
+
+class ProgressReporter:
+    # Satu baris progress paling sering tiap every_rows baris atau tiap every_seconds detik
+    def __init__(self, label, total=None, every_rows=None, every_seconds=None):
+        self.label = label
+        self.total = total
+        self.every_rows = every_rows or get_option("progress-rows", int(os.getenv("IMPORT_PROGRESS_ROWS", 100000)), int)
+        self.every_seconds = every_seconds or get_option("progress-seconds", float(os.getenv("IMPORT_PROGRESS_SECONDS", 10)), float)
+        self.start = time.perf_counter()
+        self.count = 0
+        self.last_count = 0
+        self.last_time = self.start
+
+    def update(self, rows):
+        self.count += rows
+        now = time.perf_counter()
+        if self.count - self.last_count >= self.every_rows or now - self.last_time >= self.every_seconds:
+            self.print_line(now)
+
+    def print_line(self, now=None):
+        now = now or time.perf_counter()
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0
+        total = f"/{self.total:,}" if self.total else ""
+        print(f"{self.label}{self.count:,}{total} baris ({elapsed:.1f} detik, {rate:,.0f} baris/detik)")
+        self.last_count = self.count
+        self.last_time = now
+
+    def done(self):
+        if self.count != self.last_count:
+            self.print_line()
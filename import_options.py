@@ -0,0 +1,38 @@
+import sys
+
+# Opsi yang membutuhkan nilai, bisa ditulis "--nama=nilai" atau "--nama nilai"
+OPTIONS_WITH_VALUE = {"batch-size", "grapari-ttl", "grapari-snapshot", "chunk-size", "reject-dir", "workers", "rows", "units", "seed", "file", "history", "metrics-dir", "progress-rows", "progress-seconds", "parse-cache-dir", "parse-cache-max-mb", "priority-rules", "fetch-size", "watch-dir", "poll-seconds", "settle-seconds", "template-table", "template-unique-table", "output", "memory-mb", "partitions", "spill-dir"}
+
+
+def get_positional_args(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    positional = []
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg.startswith("--"):
+            skip_next = "=" not in arg and arg[2:] in OPTIONS_WITH_VALUE
+            continue
+        positional.append(arg)
+    return positional
+
+
+def has_flag(name, argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    return f"--{name}" in argv
+
+
+def get_option(name, default=None, cast=str, argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for idx, arg in enumerate(argv):
+        if arg.startswith(f"--{name}="):
+            return cast(arg.split("=", 1)[1])
+        if arg == f"--{name}" and idx + 1 < len(argv):
+            return cast(argv[idx + 1])
+    return default
+
+
+def is_truncate(argv=None):
+    return any(arg.lower() == "truncate" for arg in get_positional_args(argv)[2:])
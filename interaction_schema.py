@@ -0,0 +1,117 @@
+import os
+import pandas as pd
+from pandas.api.types import union_categoricals
+from import_options import get_option
+from interaction_transform import TIMESTAMP_FORMAT
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    # Tanpa pyarrow tetap memakai dtype string bawaan pandas
+    TEXT_DTYPE = pd.StringDtype("python")
+
+# Kolom dengan nilai berulang (ratusan/ribuan nilai berbeda untuk jutaan baris)
+CATEGORY_COLUMNS = [
+    "brand", "unit_type", "unit_name", "unit_name_final", "area_name", "reg_name",
+    "topic_reason_1", "topic_reason_2", "topic_result", "service", "type_service"
+]
+# Teks bebas / nilai hampir unik
+TEXT_COLUMNS = ["app_id", "user_id", "employee_code", "employee_name", "notes"]
+
+
+def get_fetch_size():
+    return get_option("fetch-size", int(os.getenv("UNIQUE_FETCH_SIZE", 50000)), int)
+
+
+def read_dtypes():
+    # dtype untuk pd.read_csv file txt; msisdn dan update_stamp tetap string
+    # karena update_stamp divalidasi dulu dan msisdn ditulis kembali apa adanya
+    dtypes = {col: "category" for col in CATEGORY_COLUMNS}
+    dtypes.update({col: TEXT_DTYPE for col in TEXT_COLUMNS + ["msisdn", "update_stamp"]})
+    return dtypes
+
+
+def compact_msisdn(msisdn):
+    # msisdn berupa angka tanpa nol di depan disimpan sebagai int64 (8 byte per baris).
+    # Jika ada nilai lain (nomor Indihome diawali 0, kosong, 'EMPTY') dipakai kategori:
+    # tiap nomor disimpan sekali dan baris hanya menyimpan kode int32, nilainya tidak berubah
+    text = msisdn.astype(TEXT_DTYPE)
+    if text.notna().all() and text.str.fullmatch(r"[1-9][0-9]{0,17}").all():
+        return text.astype("int64")
+    return text.astype("category")
+
+
+def compact_frame(df):
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype("category")
+        elif col in TEXT_COLUMNS:
+            df[col] = df[col].astype(TEXT_DTYPE)
+    if 'msisdn' in df:
+        df['msisdn'] = compact_msisdn(df['msisdn'])
+    if 'update_stamp' in df:
+        df['update_stamp'] = pd.to_datetime(df['update_stamp'], errors='coerce')
+    return df
+
+
+def concat_compact(frames):
+    # pd.concat biasa mengubah kategori yang berbeda antar chunk menjadi object
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = pd.Series(union_categoricals(parts))
+        elif len({str(part.dtype) for part in parts}) == 1:
+            columns[col] = pd.concat(parts, ignore_index=True)
+        else:
+            # Misal msisdn int64 di satu chunk dan kategori di chunk lain
+            columns[col] = pd.concat([part.astype(TEXT_DTYPE) for part in parts], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_interactions(conn, query, params=None, fetch_size=None):
+    # Cursor unbuffered: baris diambil bertahap dari server dan langsung dikonversi
+    # ke schema ringkas per chunk, tanpa list dict untuk seluruh bulan
+    fetch_size = fetch_size or get_fetch_size()
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        columns = list(cursor.column_names)
+        frames = []
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            frames.append(compact_frame(pd.DataFrame.from_records(rows, columns=columns)))
+    finally:
+        cursor.close()
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return concat_compact(frames)
+
+
+def align_msisdn(left, right):
+    # Untuk merge: kedua sisi harus punya dtype msisdn yang sama
+    if left['msisdn'].dtype != right['msisdn'].dtype:
+        left = left.assign(msisdn=left['msisdn'].astype(TEXT_DTYPE))
+        right = right.assign(msisdn=right['msisdn'].astype(TEXT_DTYPE))
+    return left, right
+
+
+def to_db_rows(df, cols):
+    # Kembali ke nilai Python biasa untuk executemany: msisdn string, update_stamp teks, NaN -> None
+    frame = df[cols].copy()
+    if 'msisdn' in frame and pd.api.types.is_integer_dtype(frame['msisdn']):
+        frame['msisdn'] = frame['msisdn'].astype(str)
+    if 'update_stamp' in frame and pd.api.types.is_datetime64_any_dtype(frame['update_stamp']):
+        frame['update_stamp'] = frame['update_stamp'].dt.strftime(TIMESTAMP_FORMAT)
+    frame = frame.astype(object)
+    frame = frame.where(frame.notna(), None)
+    return frame.itertuples(index=False, name=None)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+from import_options import get_option
+from import_metrics import timed
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EMPTY = 'EMPTY'
+
+insert_columns = [
+    "update_stamp", "msisdn", "brand", "unit_type", "unit_name", "unit_name_final",
+    "area_name", "reg_name", "topic_reason_1", "topic_reason_2", "topic_result",
+    "service", "app_id", "user_id", "employee_code", "employee_name", "notes", "type_service"
+]
+
+
+def derive_type_service(msisdn):
+    # 628xxx -> Telkomsel, nomor lain -> Indihome, kosong -> None
+    msisdn = msisdn.astype(object).where(msisdn.notna(), '').astype(str)
+    type_service = np.where(msisdn.str.startswith('628'), 'Telkomsel', 'Indihome')
+    return pd.Series(type_service, index=msisdn.index, dtype=object).where(msisdn != '', None)
+
+
+def transform_interactions(df, grapari_cache, bulan=None, tahun=None, metrics=None):
+    # Satu tahap vektor: parse update_stamp sekali, cek periode untuk seluruh kolom,
+    # mapping grapari dan type_service. Baris yang tidak lolos dikembalikan
+    # terpisah beserta alasannya, tidak lagi menggagalkan seluruh file.
+    with timed(metrics, "validation", len(df)):
+        stamps = pd.to_datetime(df['update_stamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+        reasons = pd.Series(None, index=df.index, dtype=object)
+        reasons[stamps.isna()] = f"update_stamp kosong atau tidak sesuai format {TIMESTAMP_FORMAT}"
+        if bulan and tahun:
+            outside_period = stamps.notna() & ((stamps.dt.year != tahun) | (stamps.dt.month != bulan))
+            reasons[outside_period] = f"update_stamp di luar periode {str(bulan).zfill(2)}/{tahun}"
+
+        rejected = reasons.notna()
+        rejects = df[rejected].assign(reject_reason=reasons[rejected])
+        valid = df[~rejected].copy()
+        valid['update_stamp'] = stamps[~rejected]
+
+    with timed(metrics, "mapping lookup", len(valid)):
+        valid['unit_name_final'] = grapari_cache.lookup(valid['unit_name'])
+        valid['type_service'] = derive_type_service(valid['msisdn'])
+    return valid, rejects
+
+
+def to_insert_frame(df):
+    # Nilai kosong diganti 'EMPTY' sekaligus untuk semua kolom
+    frame = df[insert_columns].copy()
+    frame['update_stamp'] = frame['update_stamp'].dt.strftime(TIMESTAMP_FORMAT)
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), EMPTY)
+
+
+def get_reject_path(file_name):
+    reject_dir = get_option("reject-dir", os.path.join(os.getcwd(), "file_reject"))
+    return os.path.join(reject_dir, f"{os.path.splitext(file_name)[0]}.reject.txt")
+
+
+def write_rejects(rejects, reject_path, append=False):
+    if rejects.empty:
+        return 0
+    os.makedirs(os.path.dirname(reject_path), exist_ok=True)
+    write_header = not append or not os.path.exists(reject_path)
+    rejects.to_csv(reject_path, sep='~', index=False, mode='a' if append else 'w', header=write_header)
+    return len(rejects)
@@ -0,0 +1,155 @@
+import os
+from import_options import get_option, has_flag
+from import_manifest import begin_file, checkpoint, finish_file, lookup_file, skip_rows
+from import_metrics import timed
+from interaction_schema import read_dtypes
+from interaction_transform import get_reject_path, transform_interactions, write_rejects
+from grapari_cache import get_grapari_cache
+from parsed_cache import read_parsed_csv
+from unique_interaction import get_last_id
+
+# Mode --route-months: satu file dibaca sekali, baris dibagi per tahun-bulan update_stamp
+# lalu ditulis ke ccap_t_interaction_YYYYMM masing-masing.
+
+TABLE_PREFIX = "ccap_t_interaction_"
+UNIQUE_TABLE_PREFIX = "ccap_t_interaction_unique_"
+# Entri manifest per file untuk mode routing: 'done' jika semua bulan di file sudah tertulis
+ROUTE_TARGET = "route:ccap_t_interaction"
+
+
+def month_tables(period):
+    return f"{TABLE_PREFIX}{period}", f"{UNIQUE_TABLE_PREFIX}{period}"
+
+
+def table_exists(conn, table):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+def latest_month_table(conn, prefix):
+    # Tabel bulanan terbaru yang sudah ada, dipakai sebagai template jika tidak ditentukan
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW TABLES LIKE %s", (f"{prefix}______",))
+        tables = sorted(row[0] for row in cursor.fetchall() if row[0][len(prefix):].isdigit())
+    finally:
+        cursor.close()
+    return tables[-1] if tables else None
+
+
+def get_template_table(conn, unique=False):
+    if unique:
+        template = get_option("template-unique-table", os.getenv("INTERACTION_UNIQUE_TEMPLATE_TABLE"))
+        return template or latest_month_table(conn, UNIQUE_TABLE_PREFIX)
+    template = get_option("template-table", os.getenv("INTERACTION_TEMPLATE_TABLE"))
+    return template or latest_month_table(conn, TABLE_PREFIX)
+
+
+def ensure_table(conn, table, unique=False):
+    # Tabel bulan yang belum ada hanya dibuat dengan --create-tables (CREATE TABLE ... LIKE template)
+    if table_exists(conn, table):
+        return True
+    if not has_flag("create-tables"):
+        print(f"Tabel {table} belum ada (pakai --create-tables untuk membuat dari template)")
+        return False
+    template = get_template_table(conn, unique)
+    if template is None:
+        print(f"Tabel {table} belum ada dan tidak ada template untuk membuatnya")
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} LIKE {template}")
+    finally:
+        cursor.close()
+    print(f"Tabel {table} dibuat dari template {template}")
+    return True
+
+
+def split_by_month(df):
+    periods = df['update_stamp'].dt.year * 100 + df['update_stamp'].dt.month
+    for period, part in df.groupby(periods, sort=True):
+        yield str(int(period)), part
+
+
+def route_file(conn, txt_location, file_name, expected_columns, write_partition, metrics=None):
+    # Mengembalikan {periode: info} untuk bulan yang ditulis, atau None jika file gagal dibaca.
+    # Manifest tetap per (file, tabel tujuan), jadi resume dan skip berlaku per bulan; entri ROUTE_TARGET
+    # menandai seluruh file selesai sehingga file lama dilewati sebelum di-hash dan di-parse.
+    route_entry = lookup_file(conn, txt_location, file_name, ROUTE_TARGET)
+    if route_entry['status'] == 'done':
+        print(f"File: [{file_name}] Sudah pernah diimport (semua bulan), dilewati.")
+        return {}
+    file_hash = route_entry['content_hash']
+    try:
+        with timed(metrics, "read_csv") as record:
+            df = read_parsed_csv(txt_location, file_hash, delimiter='~', dtype=read_dtypes())
+            record['rows'] = len(df)
+    except Exception as e:
+        print(f"Error reading file {txt_location}: {e}")
+        return None
+
+    missing_columns = set(expected_columns) - set(df.columns)
+    if missing_columns:
+        print(f"File: [{file_name}] Gagal Import Txt (Format Salah). Kolom yang diharapkan tidak ditemukan: {missing_columns}")
+        return None
+
+    reject_path = get_reject_path(file_name)
+    if os.path.exists(reject_path):
+        os.remove(reject_path)
+
+    grapari_cache = get_grapari_cache(conn)
+    grapari_cache.reset_stats()
+    # Tanpa bulan/tahun: hanya update_stamp yang kosong/salah format yang ditolak
+    df, rejects = transform_interactions(df, grapari_cache, metrics=metrics)
+    rejected = write_rejects(rejects, reject_path, append=True)
+
+    touched = {}
+    missing_table = False
+    for period, part in split_by_month(df):
+        table, _ = month_tables(period)
+        if not ensure_table(conn, table):
+            rejected += write_rejects(part.assign(reject_reason=f"tabel {table} tidak ada"), reject_path, append=True)
+            missing_table = True
+            continue
+
+        entry = lookup_file(conn, txt_location, file_name, table, file_hash)
+        if entry['status'] == 'done':
+            print(f"File: [{file_name}] {len(part)} baris {period} sudah pernah diimport ke {table}, dilewati.")
+            continue
+        begin_file(conn, entry)
+        resume_from = entry['rows_committed']
+        last_id = get_last_id(conn, table)
+        part, _ = skip_rows(part, resume_from)
+
+        def save_checkpoint(batch_cursor, rows, entry=entry):
+            checkpoint(batch_cursor, entry, rows)
+
+        written = write_partition(part, table, save_checkpoint) if not part.empty else 0
+        finish_file(conn, entry)
+        touched[period] = {'table': table, 'last_id': last_id, 'resumed': resume_from > 0, 'rows': written}
+        print(f"File: [{file_name}] {written} baris ditulis ke {table}")
+
+    if rejected:
+        print(f"File: [{file_name}] {rejected} baris ditolak, lihat {reject_path}")
+    grapari_cache.report(label=f"[{file_name}] ")
+    # Bulan yang tabelnya belum ada bisa diimport ulang nanti (--create-tables), jadi file belum ditandai selesai
+    if not missing_table:
+        begin_file(conn, route_entry)
+        finish_file(conn, route_entry)
+    return touched
+
+
+def merge_touched(total, touched):
+    # Gabungan beberapa file: last_id terkecil per bulan, resume di salah satu file memicu rebuild penuh
+    for period, info in touched.items():
+        if period in total:
+            total[period]['last_id'] = min(total[period]['last_id'], info['last_id'])
+            total[period]['resumed'] = total[period]['resumed'] or info['resumed']
+            total[period]['rows'] += info['rows']
+        else:
+            total[period] = dict(info)
+    return total
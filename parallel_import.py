@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from db_connection import get_connection, init_pool
+from import_manifest import done_files, reset_manifest
+
+
+def list_txt_files(folder):
+    with os.scandir(folder) as entries:
+        return sorted(
+            (entry.path, entry.name) for entry in entries
+            if entry.is_file() and entry.name.endswith('.txt') and not entry.name.startswith('~$')
+        )
+
+
+def truncate_tables(config, tables):
+    # TRUNCATE dijalankan sekali per tabel sebelum file pertama (atau worker) mulai menulis,
+    # manifest untuk tabel tersebut ikut dikosongkan
+    conn = get_connection(config)
+    cursor = conn.cursor()
+    try:
+        for table in tables:
+            print(f"Truncating table: {table}")
+            cursor.execute(f"TRUNCATE TABLE {table}")
+            conn.commit()
+            reset_manifest(conn, table)
+            print(f"Table {table} truncated successfully.")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class ImportResult:
+    # Hasil import dari worker: truthy jika sukses, resumed=True jika file dilanjutkan dari checkpoint
+    def __init__(self, success, resumed=False):
+        self.success = success
+        self.resumed = resumed
+
+    def __bool__(self):
+        return bool(self.success)
+
+
+def skip_done_files(config, files, target_table):
+    # Manifest tabel tujuan dibaca sekali; file yang nama + ukuran + mtime-nya tercatat selesai
+    # dilewati sebelum dikirim ke worker (tanpa koneksi dan hash per file)
+    conn = get_connection(config)
+    try:
+        done = done_files(conn, target_table)
+    finally:
+        conn.close()
+    pending = []
+    for path, name in files:
+        stat = os.stat(path)
+        if (name, stat.st_size, stat.st_mtime) not in done:
+            pending.append((path, name))
+    if len(pending) < len(files):
+        print(f"{len(files) - len(pending)} file sudah pernah diimport ke {target_table}, dilewati.")
+    return pending
+
+
+def run_parallel(import_file, files, workers, config, resumed=None, **connect_kwargs):
+    # Parsing, transform dan insert tiap file berjalan di process pool.
+    # Tiap worker memegang satu koneksi MySQL dari pool yang dipakai ulang antar file.
+    # Jika resumed (set) diberikan, nama file yang dilanjutkan dari checkpoint dikumpulkan ke sana.
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_pool, initargs=(config, 1, connect_kwargs)) as executor:
+        futures = {executor.submit(import_file, path, name, truncate=False): name for path, name in files}
+        for future in as_completed(futures):
+            file_name = futures[future]
+            try:
+                outcome = future.result()
+                results[file_name] = bool(outcome)
+                if resumed is not None and getattr(outcome, 'resumed', False):
+                    resumed.add(file_name)
+            except Exception as e:
+                print(f"File: [{file_name}] Gagal Import Txt: {e}")
+                results[file_name] = False
+
+    success = sum(results.values())
+    print(f"Selesai {len(results)} file dengan {workers} worker: {success} sukses, {len(results) - success} gagal")
+    for file_name in sorted(results):
+        print(f"  [{file_name}] {'Sukses' if results[file_name] else 'Gagal'}")
+    return results
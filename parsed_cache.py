@@ -0,0 +1,137 @@
+import os
+import sys
+import pandas as pd
+from import_options import get_option, get_positional_args, has_flag
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# Cache hasil parsing file txt (DataFrame dengan schema read_dtypes) per hash isi file.
+# Dengan pyarrow disimpan sebagai Arrow IPC tanpa kompresi supaya bisa di-memory-map;
+# tanpa pyarrow jatuh ke pickle pandas (tetap melewati parsing CSV, tapi tanpa mmap).
+CACHE_EXTENSION = ".arrow" if pa is not None else ".pkl"
+
+
+def is_enabled():
+    return has_flag("parse-cache")
+
+
+def get_cache_dir():
+    return get_option("parse-cache-dir", os.getenv("PARSE_CACHE_DIR", os.path.join(os.getcwd(), "file_cache")))
+
+
+def get_max_bytes():
+    max_mb = get_option("parse-cache-max-mb", float(os.getenv("PARSE_CACHE_MAX_MB", 2048)), float)
+    return int(max_mb * 1024 * 1024)
+
+
+def cache_path(file_hash, cache_dir=None):
+    return os.path.join(cache_dir or get_cache_dir(), f"{file_hash}{CACHE_EXTENSION}")
+
+
+def load_parsed(file_hash, cache_dir=None):
+    path = cache_path(file_hash, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        if pa is not None:
+            df = feather.read_feather(path, memory_map=True)
+        else:
+            df = pd.read_pickle(path)
+    except Exception as e:
+        # File cache rusak/terpotong: dibuang dan file txt di-parse ulang
+        print(f"Cache {path} tidak bisa dibaca ({e}), dihapus")
+        os.remove(path)
+        return None
+    # atime tidak selalu aktif di server, jadi mtime dipakai sebagai penanda LRU
+    os.utime(path)
+    return df
+
+
+def save_parsed(file_hash, df, cache_dir=None):
+    cache_dir = cache_dir or get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(file_hash, cache_dir)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    # Ditulis ke file sementara lalu di-rename supaya worker lain tidak membaca file setengah jadi
+    if pa is not None:
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    evict(cache_dir, keep=path)
+    return path
+
+
+def list_entries(cache_dir=None):
+    cache_dir = cache_dir or get_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith((".arrow", ".pkl")):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return sorted(entries)
+
+
+def evict(cache_dir=None, max_bytes=None, keep=None):
+    # Hapus entri yang paling lama tidak dipakai sampai total ukuran di bawah batas
+    max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+    entries = list_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        removed += 1
+    if removed:
+        print(f"Cache parsing: {removed} file lama dihapus, sisa {total / 1024 / 1024:.1f} MB")
+    return removed
+
+
+def invalidate(file_hash=None, cache_dir=None):
+    # Tanpa hash: seluruh cache dikosongkan
+    removed = 0
+    for _, _, path in list_entries(cache_dir):
+        if file_hash is None or os.path.basename(path).startswith(file_hash):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def read_parsed_csv(txt_location, file_hash, **read_kwargs):
+    # Hasil parse dari cache jika ada, selain itu read_csv biasa lalu disimpan ke cache
+    if is_enabled():
+        df = load_parsed(file_hash)
+        if df is not None:
+            print(f"Cache parsing dipakai untuk {os.path.basename(txt_location)} ({len(df)} baris)")
+            return df
+    df = pd.read_csv(txt_location, **read_kwargs)
+    if is_enabled():
+        save_parsed(file_hash, df)
+    return df
+
+
+if __name__ == "__main__":
+    # python parsed_cache.py clear [<content_hash>] | python parsed_cache.py list
+    args = get_positional_args()
+    if not args or args[0] not in ("clear", "list"):
+        print("Usage: python parsed_cache.py clear [content_hash] [--parse-cache-dir DIR] | list")
+        sys.exit(1)
+    if args[0] == "clear":
+        removed = invalidate(args[1] if len(args) > 1 else None)
+        print(f"{removed} file cache dihapus dari {get_cache_dir()}")
+    else:
+        entries = list_entries()
+        for mtime, size, path in entries:
+            print(f"{os.path.basename(path)}  {size / 1024 / 1024:8.1f} MB")
+        print(f"Total {len(entries)} file, {sum(size for _, size, _ in entries) / 1024 / 1024:.1f} MB (batas {get_max_bytes() / 1024 / 1024:.0f} MB)")
@@ -0,0 +1,97 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from import_options import get_option
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "priority_rules.json")
+
+
+def get_rules_path():
+    return get_option("priority-rules", os.getenv("PRIORITY_RULES", DEFAULT_RULES_PATH))
+
+
+def code_prefix(value):
+    # Padanan tanpa regex dari ^([A-Z]+\d*): huruf besar di depan lalu angka
+    if not isinstance(value, str):
+        return None
+    end = 0
+    while end < len(value) and 'A' <= value[end] <= 'Z':
+        end += 1
+    if end == 0:
+        return None
+    while end < len(value) and value[end].isdigit():
+        end += 1
+    return value[:end]
+
+
+class PriorityClassifier:
+    def __init__(self, topic_to_service_detail, priority_order, default_priority=99, source=None):
+        self.topic_to_service_detail = topic_to_service_detail
+        self.priority_order = priority_order
+        self.default_priority = default_priority
+        self.source = source
+        self.mtime = os.path.getmtime(source) if source else None
+        # Prioritas per nilai unik (kategori), bukan per baris; dipakai ulang antar batch
+        self.value_priority = {}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        return cls(rules['topic_to_service_detail'], rules['priority_order'], rules.get('default_priority', 99), source=path)
+
+    def priority_of(self, service_detail):
+        # PRIORITY = priority_order[prefix], lalu priority_order[huruf pertama], lalu default
+        priority = self.value_priority.get(service_detail)
+        if priority is None:
+            prefix = code_prefix(service_detail)
+            if prefix is None:
+                priority = self.default_priority
+            else:
+                priority = self.priority_order.get(prefix, self.priority_order.get(prefix[0], self.default_priority))
+            if isinstance(service_detail, str):
+                self.value_priority[service_detail] = priority
+        return priority
+
+    def category_arrays(self, values):
+        # Kolom dikodekan sebagai kategori; aturan hanya dievaluasi sekali per kategori.
+        # Satu slot tambahan di akhir untuk kode -1 (NaN) sehingga take() dengan kode -1 aman.
+        categorical = pd.Categorical(values)
+        categories = categorical.categories.astype(object)
+        return categorical.codes, np.append(np.asarray(categories, dtype=object), None)
+
+    def classify(self, topic_result, service):
+        # SERVICE_DETAIL = mapping topic_result, fallback ke service; PRIORITY dari SERVICE_DETAIL.
+        # Semua operasi per baris berupa take() numpy atas kode kategori.
+        topic_codes, topic_values = self.category_arrays(topic_result)
+        service_codes, service_values = self.category_arrays(service)
+
+        topic_detail = np.array([self.topic_to_service_detail.get(value) for value in topic_values], dtype=object)
+        topic_mapped = np.array([detail is not None for detail in topic_detail])
+        topic_priority = np.array([self.priority_of(detail) for detail in topic_detail], dtype=np.int16)
+        service_priority = np.array([self.priority_of(value) for value in service_values], dtype=np.int16)
+
+        mapped = topic_mapped.take(topic_codes)
+        detail = np.where(mapped, topic_detail.take(topic_codes), service_values.take(service_codes))
+        priority = np.where(mapped, topic_priority.take(topic_codes), service_priority.take(service_codes))
+        return detail, priority
+
+    def add_priority(self, df):
+        detail, priority = self.classify(df['topic_result'], df['service'])
+        df['SERVICE_DETAIL'] = pd.Categorical(detail)
+        df['PRIORITY'] = priority
+        return df
+
+
+_classifier = None
+
+
+def get_classifier():
+    # Satu classifier per proses; dimuat ulang otomatis jika file aturan berubah
+    global _classifier
+    path = get_rules_path()
+    if _classifier is None or _classifier.source != path or _classifier.mtime != os.path.getmtime(path):
+        _classifier = PriorityClassifier.from_file(path)
+        print(f"Aturan prioritas dimuat dari {path}: {len(_classifier.topic_to_service_detail)} topik, {len(_classifier.priority_order)} kode")
+    return _classifier
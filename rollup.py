@@ -0,0 +1,201 @@
+import os
+import pandas as pd
+from import_options import has_flag
+from interaction_transform import EMPTY
+
+# Rollup harian untuk dashboard, diisi di pass import yang sama (--rollup / IMPORT_ROLLUP=1).
+# ccap_t_interaction_rollup_YYYYMM berisi satu baris per (grain, tanggal, nilai dimensi grain tersebut);
+# dimensi di luar grain bernilai NULL. Contoh: WHERE grain = 'grapari' GROUP BY unit_name_final.
+# Keduanya di-upsert aditif per batch, di transaksi yang sama dengan batch datanya:
+#   interaction_count  jumlah baris
+#   unique_msisdn      hanya key (grain, tanggal, grup, msisdn) yang belum tercatat di
+#                      ccap_t_interaction_rollup_seen_YYYYMM yang menambah hitungan. Tabel seen berisi
+#                      hash 64-bit per key, jadi ukurannya mengikuti jumlah msisdn unik per hari x 4 grain,
+#                      bukan jumlah baris input, dan tidak perlu scan ulang tabel interaksi.
+
+TABLE_PREFIX = "ccap_t_interaction_"
+LOCK_TABLE = "ccap_t_interaction_rollup_lock"
+GRAINS = {
+    'grapari': ['unit_name_final'],
+    'area': ['reg_name', 'area_name'],
+    'service': ['service', 'type_service'],
+    'topic': ['topic_result'],
+}
+DIMENSIONS = ["unit_name_final", "reg_name", "area_name", "service", "type_service", "topic_result"]
+
+GRAIN_CODES = {grain: code for code, grain in enumerate(GRAINS, start=1)}
+KEY_INSERT_SIZE = 5000
+
+
+def is_enabled():
+    return has_flag("rollup") or os.getenv("IMPORT_ROLLUP") == "1"
+
+
+def rollup_tables(table_interaction):
+    # ccap_t_interaction_202505[_shadow] -> ccap_t_interaction_rollup_202505[_shadow], ..._rollup_seen_...
+    suffix = table_interaction[len(TABLE_PREFIX):]
+    return f"{TABLE_PREFIX}rollup_{suffix}", f"{TABLE_PREFIX}rollup_seen_{suffix}"
+
+
+def ensure_rollup_tables(conn, table_interaction):
+    # DDL (commit implisit) dijalankan sebelum batch pertama, bukan di dalam transaksi batch
+    rollup_table, seen_table = rollup_tables(table_interaction)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {rollup_table} (
+            grain VARCHAR(16) NOT NULL,
+            rollup_date DATE NOT NULL,
+            group_hash BIGINT UNSIGNED NOT NULL,
+            unit_name_final VARCHAR(255) NULL,
+            reg_name VARCHAR(255) NULL,
+            area_name VARCHAR(255) NULL,
+            service VARCHAR(255) NULL,
+            type_service VARCHAR(32) NULL,
+            topic_result VARCHAR(255) NULL,
+            interaction_count BIGINT NOT NULL DEFAULT 0,
+            unique_msisdn BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (grain, rollup_date, group_hash)
+        ) DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {seen_table} (
+            grain TINYINT UNSIGNED NOT NULL,
+            rollup_date DATE NOT NULL,
+            key_hash BIGINT UNSIGNED NOT NULL,
+            PRIMARY KEY (grain, rollup_date, key_hash)
+        )
+        """)
+        # Satu baris kunci per tabel rollup: SELECT ... FOR UPDATE di awal tiap merge menserialkan
+        # rollup + seen antar worker sampai commit, jadi tidak ada deadlock atau duplicate key
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LOCK_TABLE} (
+            rollup_table VARCHAR(64) NOT NULL PRIMARY KEY
+        )
+        """)
+        cursor.execute(f"INSERT IGNORE INTO {LOCK_TABLE} (rollup_table) VALUES (%s)", (rollup_table,))
+        conn.commit()
+    finally:
+        cursor.close()
+    return rollup_table, seen_table
+
+
+def reset_rollup(conn, table_interaction):
+    # Dipanggil saat tabel interaksi di-truncate atau shadow baru dibuat. Rollup lama selalu dibuang
+    # (tanpa --rollup isinya tidak akan cocok lagi), dibuat ulang kosong hanya jika --rollup aktif.
+    cursor = conn.cursor()
+    try:
+        for table in rollup_tables(table_interaction):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+    finally:
+        cursor.close()
+    if is_enabled():
+        ensure_rollup_tables(conn, table_interaction)
+
+
+def rollup_swap_pairs(conn, table_interaction, shadow):
+    # Untuk finish_shadow: rollup dan seen shadow ikut ditukar dalam RENAME yang sama dengan tabel interaksinya
+    if not is_enabled():
+        return []
+    tables = ensure_rollup_tables(conn, table_interaction)
+    shadows = ensure_rollup_tables(conn, shadow)
+    return [(table, shadow_table, {}) for table, shadow_table in zip(tables, shadows)]
+
+
+def hash_columns(df, columns):
+    # Nilai dinormalisasi ke string supaya hash sama untuk kategori/string/object
+    frame = df[columns].astype(object)
+    frame = frame.where(frame.notna(), '').astype(str)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class RollupWriter:
+    # Dimensi dan hash per grain dihitung sekali untuk seluruh frame; apply() mengambil n baris berikutnya
+    # sesuai urutan batch insert dan meng-upsert rollup-nya dengan cursor batch tersebut.
+    def __init__(self, conn, df, table_interaction):
+        self.rollup_table, self.seen_table = ensure_rollup_tables(conn, table_interaction)
+        # Nilai kosong ditulis 'EMPTY' seperti di tabel interaksi
+        frame = df[DIMENSIONS].astype(object)
+        frame = frame.where(frame.notna(), EMPTY)
+        frame['rollup_date'] = df['update_stamp'].dt.date.to_numpy()
+        frame['has_msisdn'] = df['msisdn'].notna().to_numpy()
+        msisdn = df[['msisdn']].reset_index(drop=True)
+        for grain, dims in GRAINS.items():
+            frame[f"{grain}_hash"] = hash_columns(frame, dims)
+            frame[f"{grain}_key"] = hash_columns(pd.concat([frame[dims].reset_index(drop=True), msisdn], axis=1), dims + ['msisdn'])
+        self.frame = frame.reset_index(drop=True)
+        self.offset = 0
+
+    def apply(self, cursor, rows):
+        part = self.frame.iloc[self.offset:self.offset + rows]
+        self.offset += rows
+        if part.empty:
+            return
+
+        columns = ['grain', 'rollup_date', 'group_hash'] + DIMENSIONS + ['interaction_count']
+        counts = []
+        keys = []
+        with_msisdn = part[part['has_msisdn']]
+        for grain, dims in GRAINS.items():
+            grouped = part.groupby(['rollup_date', f"{grain}_hash"] + dims, sort=False).size().reset_index(name='interaction_count')
+            grouped = grouped.rename(columns={f"{grain}_hash": 'group_hash'}).assign(grain=grain)
+            counts.append(grouped.reindex(columns=columns))
+            grain_keys = with_msisdn[['rollup_date', f"{grain}_key", f"{grain}_hash"]].drop_duplicates(['rollup_date', f"{grain}_key"])
+            grain_keys.columns = ['rollup_date', 'key_hash', 'group_hash']
+            keys.append(grain_keys.assign(grain=GRAIN_CODES[grain]))
+        counts = pd.concat(counts, ignore_index=True).sort_values(['grain', 'rollup_date', 'group_hash'])
+        counts = counts.astype(object).where(counts.notna(), None)
+        keys = pd.concat(keys, ignore_index=True)[['grain', 'rollup_date', 'key_hash', 'group_hash']].astype(object)
+
+        cursor.execute(f"SELECT rollup_table FROM {LOCK_TABLE} WHERE rollup_table = %s FOR UPDATE", (self.rollup_table,))
+        cursor.fetchall()
+        cursor.executemany(
+            f"INSERT INTO {self.rollup_table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE interaction_count = interaction_count + VALUES(interaction_count)",
+            list(counts.itertuples(index=False, name=None))
+        )
+        if keys.empty:
+            return
+
+        # msisdn unik: hanya key yang belum ada di tabel seen yang menambah unique_msisdn grupnya
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS tmp_rollup_keys ("
+            "grain TINYINT UNSIGNED NOT NULL, rollup_date DATE NOT NULL, key_hash BIGINT UNSIGNED NOT NULL, "
+            "group_hash BIGINT UNSIGNED NOT NULL, PRIMARY KEY (grain, rollup_date, key_hash))"
+        )
+        cursor.execute("DELETE FROM tmp_rollup_keys")
+        key_rows = list(keys.itertuples(index=False, name=None))
+        # Mode --bulk memanggil apply sekali untuk seluruh file, jadi key dikirim bertahap (max_allowed_packet)
+        for start in range(0, len(key_rows), KEY_INSERT_SIZE):
+            cursor.executemany(
+                "INSERT INTO tmp_rollup_keys (grain, rollup_date, key_hash, group_hash) VALUES (%s, %s, %s, %s)",
+                key_rows[start:start + KEY_INSERT_SIZE]
+            )
+        cursor.execute(f"""
+        DELETE t FROM tmp_rollup_keys t
+        JOIN {self.seen_table} s ON s.grain = t.grain AND s.rollup_date = t.rollup_date AND s.key_hash = t.key_hash
+        """)
+        cursor.execute(f"INSERT INTO {self.seen_table} (grain, rollup_date, key_hash) SELECT grain, rollup_date, key_hash FROM tmp_rollup_keys")
+        grain_names = " ".join(f"WHEN {code} THEN '{grain}'" for grain, code in GRAIN_CODES.items())
+        cursor.execute(f"""
+        UPDATE {self.rollup_table} r
+        JOIN (
+            SELECT CASE grain {grain_names} END AS grain, rollup_date, group_hash, COUNT(*) AS new_msisdn
+            FROM tmp_rollup_keys GROUP BY grain, rollup_date, group_hash
+        ) t ON r.grain = t.grain AND r.rollup_date = t.rollup_date AND r.group_hash = t.group_hash
+        SET r.unique_msisdn = r.unique_msisdn + t.new_msisdn
+        """)
+
+
+def rollup_hook(conn, df, table_interaction, before_commit=None):
+    # Tanpa --rollup hook tidak berubah; dengan --rollup rollup di-upsert dulu, lalu checkpoint manifest
+    if not is_enabled() or df.empty:
+        return before_commit
+    writer = RollupWriter(conn, df, table_interaction)
+
+    def apply(cursor, rows):
+        writer.apply(cursor, rows)
+        if before_commit:
+            before_commit(cursor, rows)
+    return apply
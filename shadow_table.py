@@ -0,0 +1,108 @@
+from import_manifest import rename_manifest, reset_manifest
+
+# Mode --shadow: tabel diisi sebagai salinan (<tabel>_shadow) tanpa index sekunder,
+# index dibangun sekaligus di akhir, lalu ditukar dengan RENAME TABLE (atomik).
+# Pembaca tetap melihat isi lama sampai swap, tidak pernah tabel kosong/setengah terisi.
+
+
+def shadow_name(table):
+    return f"{table}_shadow"
+
+
+def get_secondary_indexes(conn, table):
+    # Index non-unique selain PRIMARY; index UNIQUE tetap dipasang supaya constraint berlaku selama load.
+    # Index fungsional (column_name NULL) tidak ditunda karena tidak bisa direkonstruksi dari kolom saja;
+    # index tersebut tetap ada di shadow hasil CREATE TABLE ... LIKE.
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT index_name, column_name, sub_part, index_type, collation FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name <> 'PRIMARY' AND non_unique = 1 "
+            "ORDER BY index_name, seq_in_index",
+            (table,)
+        )
+        indexes = {}
+        functional = set()
+        for index_name, column_name, sub_part, index_type, collation in cursor.fetchall():
+            if column_name is None:
+                functional.add(index_name)
+                continue
+            column = f"`{column_name}`({sub_part})" if sub_part else f"`{column_name}`"
+            # collation 'D' = key part DESC (MySQL 8), selain itu ASC / tidak berlaku (FULLTEXT)
+            if collation == 'D':
+                column += " DESC"
+            indexes.setdefault(index_name, {'type': index_type, 'columns': []})['columns'].append(column)
+    finally:
+        cursor.close()
+    for index_name in functional:
+        indexes.pop(index_name, None)
+    if functional:
+        print(f"Index fungsional {', '.join(sorted(functional))} di {table} tidak ditunda")
+    return indexes
+
+
+def index_clause(name, index):
+    kind = f"{index['type']} INDEX" if index['type'] in ("FULLTEXT", "SPATIAL") else "INDEX"
+    return f"ADD {kind} `{name}` ({', '.join(index['columns'])})"
+
+
+def create_shadow(conn, table):
+    # Shadow lama (sisa run yang gagal) dibuang; manifest untuk shadow ikut dikosongkan
+    shadow = shadow_name(table)
+    indexes = get_secondary_indexes(conn, table)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+        cursor.execute(f"CREATE TABLE {shadow} LIKE {table}")
+        if indexes:
+            cursor.execute(f"ALTER TABLE {shadow} " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+    finally:
+        cursor.close()
+    reset_manifest(conn, shadow)
+    print(f"Shadow {shadow} dibuat dari {table} ({len(indexes)} index sekunder ditunda)")
+    return shadow, indexes
+
+
+def build_indexes(conn, shadow, indexes):
+    # Semua index dibangun dalam satu ALTER (sort-based build), bukan per baris saat insert
+    if not indexes:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"ALTER TABLE {shadow} " + ", ".join(index_clause(name, index) for name, index in indexes.items()))
+    finally:
+        cursor.close()
+    print(f"Index {', '.join(indexes)} dibangun di {shadow}")
+
+
+def swap_tables(conn, pairs):
+    # pairs: [(tabel, shadow), ...]; semua ditukar dalam satu RENAME TABLE, lalu tabel lama dibuang
+    renames = []
+    for table, shadow in pairs:
+        renames += [f"{table} TO {table}_old", f"{shadow} TO {table}"]
+    cursor = conn.cursor()
+    try:
+        for table, _ in pairs:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}_old")
+        cursor.execute("RENAME TABLE " + ", ".join(renames))
+        for table, _ in pairs:
+            cursor.execute(f"DROP TABLE {table}_old")
+    finally:
+        cursor.close()
+    for table, shadow in pairs:
+        # Entri manifest yang ditulis ke shadow sekarang milik tabel aslinya
+        reset_manifest(conn, table)
+        rename_manifest(conn, shadow, table)
+        print(f"Tabel {table} ditukar dengan {shadow}")
+
+
+def finish_shadow(conn, tables, results):
+    # tables: [(tabel, shadow, index)]; swap hanya jika semua file sukses, jika tidak tabel asli tetap dipakai
+    failed = sorted(name for name, success in results.items() if not success)
+    if failed:
+        print(f"{len(failed)} file gagal ({', '.join(failed[:5])}), shadow tidak ditukar dan tabel asli tidak berubah")
+        return False
+    for _, shadow, indexes in tables:
+        build_indexes(conn, shadow, indexes)
+    swap_tables(conn, [(table, shadow) for table, shadow, _ in tables])
+    return True
@@ -0,0 +1,86 @@
+import os
+import queue
+import sys
+import threading
+import time
+from import_options import get_option
+
+_END = object()
+
+
+def get_chunk_size():
+    # Urutan: --chunk-size di command line, lalu IMPORT_CHUNK_SIZE di .env, default 50000
+    chunk_size = get_option("chunk-size", int(os.getenv("IMPORT_CHUNK_SIZE", 50000)), int)
+    if chunk_size < 1:
+        raise ValueError("Chunk size harus lebih besar dari 0")
+    return chunk_size
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    # RSS saat ini (bukan puncak), hanya tersedia di Linux
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def stream_chunks(reader, transform, queue_size=2, metrics=None):
+    # Parsing + transform chunk berikutnya berjalan di thread terpisah selagi chunk
+    # sekarang ditulis ke DB. Queue dibatasi supaya paling banyak queue_size chunk
+    # yang menunggu di memori, berapapun ukuran file.
+    chunks = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            chunks_iter = iter(reader)
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks_iter, None)
+                if chunk is None:
+                    break
+                if metrics:
+                    metrics.add("read_csv", time.perf_counter() - start, len(chunk))
+                if not put(transform(chunk)):
+                    return
+            put(_END)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="chunk-reader", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+        close = getattr(reader, 'close', None)
+        if close:
+            close()
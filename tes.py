@@ -1,155 +1,161 @@
+import os
+import pickle
+import shutil
+import tempfile
 import pandas as pd
-import datetime
-
-# =========================
-# Step 1: Load file txt
-# =========================
-input_file = 'interaction_base_crmbe_interaction_20250406_222509.txt'
-df = pd.read_csv(input_file, delimiter='~', low_memory=False)
-
-# =========================
-# Step 2: Mapping Topic ke SERVICE_DETAIL
-# =========================
-# Buat dictionary mapping
-topic_to_service_detail = {
-    # P1
-    "P11-Permintaan Pasang Baru Telkomsel Halo": "P1",
-    "P11-Permintaan Penambahan Kontrak Pasang Baru Telkomsel Halo": "P1",
-    "P11-Permintaan Pasang Baru Telkomsel Halo Nomor Cantik": "P1",
-    "P15-Permintaan reestablish": "P1",
-    "P32-Permintaan Pre2Post Halo+": "P1",
-    "P32-Permintaan Post2Pre karena migrasi Halo+": "P1",
-    "P52-Permintaan perubahan kepemilikan": "P1",
-    "P52-Permintaan perubahan customer type": "P1",
-    "P52-Permintaan Perubahan Data Pelanggan": "P1",
-    "P58-Permintaan Migrasi Seamless P2P": "P1",
-    "P58-Permintaan Migrasi Pre to Post": "P1",
-    "P59-Permintaan Migrasi Post to Pre": "P1",
-    "P61-Permintaan aktivasi produk campaign": "P1",
-    "P71-Permintaan berhenti berlangganan": "P1",
-
-    # P2
-    "P13-Permintaan registrasi Prabayar": "P2",
-    "P13-Permintaan registrasi Prabayar WNA": "P2",
-    "P14-Permintaan Reaktivasi": "P2",
-    "P51-Ganti Kartu Karena Hilang": "P2",
-    "P51-Ganti Kartu Karena Hilang, Terdapat Fitur Banking": "P2",
-    "P51-Ganti Kartu Karena Rusak Akibat Penggunaan": "P2",
-    "P51-Ganti Kartu Karena Rusak Akibat Penggunaan, Terdapat Fitur Banking": "P2",
-    "P51-Ganti Kartu Karena Rusak Fabrikasi": "P2",
-    "P51-Ganti Kartu Untuk Reaktivasi": "P2",
-    "P51-Ganti Kartu Untuk Upgrade Kartu": "P2",
-    "P51-Ganti Kartu Online Untuk Upgrade 4G": "P2",
-    "P51-Ganti Kartu Online Karena Rusak/Hilang Online": "P2",
-    "P51-Ganti Kartu Online": "P2",
-    "P51-Permintaan Registrasi IMEI Roamer": "P2",
-
-    # P44
-    "P44-Permintaan pembayaran cicilan tagihan": "P44",
-    "P44-Permintaan pembayaran deposit": "P44",
-    "P44-Permintaan pembayaran tagihan": "P44"
-}
-
-# =========================
-# Step 3: Tambah kolom SERVICE_DETAIL
-# =========================
-df['SERVICE_DETAIL'] = df['topic_result'].map(topic_to_service_detail)
-df['SERVICE_DETAIL'] = df['SERVICE_DETAIL'].fillna(df['service']).astype(str)
-
-# =========================
-# Step 4: Buat skor prioritas berdasarkan SERVICE_DETAIL
-# =========================
-priority_order = {
-    'P1': 1, 'P44': 2, 'P2': 3, 'P': 4, 'O': 5, 'K': 6, 'I': 7, 'C': 8
-}
-
-# Ekstrak awalan huruf dari SERVICE_DETAIL untuk menentukan prioritas
-df['PRIORITY'] = df['SERVICE_DETAIL'].str.extract(r'^([A-Z]+\d*)')[0].map(
-    lambda x: priority_order.get(str(x) if str(x) in priority_order else str(x)[0] if pd.notna(x) and str(x) else None, 99)
-)
-
-# =========================
-# Step 5: Ambil data unik berdasarkan msisdn dan prioritas tertinggi
-# =========================
-df_sorted = df.sort_values(by='PRIORITY')
-df_unique = df_sorted.drop_duplicates(subset='msisdn', keep='first')
-
-# =========================
-# Step 6: Simpan ke file output
-# =========================
-output_file = 'output_unique_msisdn.txt'
-df_unique.to_csv(output_file, sep='~', index=False)
-
-print(f"✅ File berhasil disimpan sebagai: {output_file}")
-
-# =========================
-# Langkah Tambahan: Transformasi Unique dan Insert ke Tabel Unik
-# =========================
-
-# Mapping topik ke SERVICE_DETAIL
-topic_to_service_detail = {
-    # P1
-    "P11-Permintaan Pasang Baru Telkomsel Halo": "P1",
-    "P11-Permintaan Penambahan Kontrak Pasang Baru Telkomsel Halo": "P1",
-    "P11-Permintaan Pasang Baru Telkomsel Halo Nomor Cantik": "P1",
-    "P15-Permintaan reestablish": "P1",
-    "P32-Permintaan Pre2Post Halo+": "P1",
-    "P32-Permintaan Post2Pre karena migrasi Halo+": "P1",
-    "P52-Permintaan perubahan kepemilikan": "P1",
-    "P52-Permintaan perubahan customer type": "P1",
-    "P52-Permintaan Perubahan Data Pelanggan": "P1",
-    "P58-Permintaan Migrasi Seamless P2P": "P1",
-    "P58-Permintaan Migrasi Pre to Post": "P1",
-    "P59-Permintaan Migrasi Post to Pre": "P1",
-    "P61-Permintaan aktivasi produk campaign": "P1",
-    "P71-Permintaan berhenti berlangganan": "P1",
-
-    # P2
-    "P13-Permintaan registrasi Prabayar": "P2",
-    "P13-Permintaan registrasi Prabayar WNA": "P2",
-    "P14-Permintaan Reaktivasi": "P2",
-    "P51-Ganti Kartu Karena Hilang": "P2",
-    "P51-Ganti Kartu Karena Hilang, Terdapat Fitur Banking": "P2",
-    "P51-Ganti Kartu Karena Rusak Akibat Penggunaan": "P2",
-    "P51-Ganti Kartu Karena Rusak Akibat Penggunaan, Terdapat Fitur Banking": "P2",
-    "P51-Ganti Kartu Karena Rusak Fabrikasi": "P2",
-    "P51-Ganti Kartu Untuk Reaktivasi": "P2",
-    "P51-Ganti Kartu Untuk Upgrade Kartu": "P2",
-    "P51-Ganti Kartu Online Untuk Upgrade 4G": "P2",
-    "P51-Ganti Kartu Online Karena Rusak/Hilang Online": "P2",
-    "P51-Ganti Kartu Online": "P2",
-    "P51-Permintaan Registrasi IMEI Roamer": "P2",
-
-    # P44
-    "P44-Permintaan pembayaran cicilan tagihan": "P44",
-    "P44-Permintaan pembayaran deposit": "P44",
-    "P44-Permintaan pembayaran tagihan": "P44"
-}
-
-priority_order = {
-    'P1': 1, 'P44': 2, 'P2': 3, 'P': 4, 'K': 5, 'O': 6, 'I': 7, 'C': 8
-}
-
-# Ambil data dari tabel yang baru saja diinsert
-df = pd.read_sql(f"SELECT * FROM {tabel_tujuan}", conn)
-
-# Mapping SERVICE_DETAIL
-df['SERVICE_DETAIL'] = df['topic_result'].map(topic_to_service_detail)
-df['SERVICE_DETAIL'] = df['SERVICE_DETAIL'].fillna(df['service']).astype(str)
-
-# Hitung PRIORITY
-df['PRIORITY'] = df['SERVICE_DETAIL'].str.extract(r'^([A-Z]+\d*)')[0].map(
-    lambda x: priority_order.get(str(x) if str(x) in priority_order else str(x)[0] if pd.notna(x) and str(x) else None, 99)
-)
-
-# Deduplikasi berdasarkan msisdn dan prioritas
-df_sorted = df.sort_values(by='PRIORITY')
-df_unique = df_sorted.drop_duplicates(subset='msisdn', keep='first')
-
-# Tentukan nama tabel unik berdasarkan waktu
-now = datetime.datetime.now()
-unique_table_name = f"ccap_t_interaction_unique_{now.strftime('%Y%m')}"
-
-# Insert ke tabel unik
-df_unique.to_sql(unique_table_name, con=conn, if_exists='append', index=False)
-print(f"✅ Data unik berhasil disimpan ke tabel {unique_table_name}")
\ No newline at end of file
+from import_options import get_option, get_positional_args, has_flag
+from import_metrics import ProgressReporter
+from priority_classifier import get_classifier
+from streaming_import import get_chunk_size, peak_rss_mb
+
+# Dedup offline file dump interaksi -> output_unique_msisdn.txt tanpa memuat seluruh file ke memori.
+#   python tes.py [input.txt] [--output FILE] [--per-day] [--chunk-size N] [--memory-mb N] [--partitions N] [--spill-dir DIR]
+# Satu baris per msisdn (atau per msisdn + tanggal dengan --per-day): PRIORITY terkecil menang,
+# jika PRIORITY sama baris yang paling awal di file yang menang.
+
+DEFAULT_INPUT = 'interaction_base_crmbe_interaction_20250406_222509.txt'
+DEFAULT_OUTPUT = 'output_unique_msisdn.txt'
+ROW_COLUMN = '_row'
+KEY_COLUMN = '_key'
+MAX_SPILL_DEPTH = 8
+
+
+def reduce_best(df):
+    # Pemenang per key dalam satu frame
+    df = df.sort_values(by=['PRIORITY', ROW_COLUMN], kind='stable')
+    return df.drop_duplicates(subset=KEY_COLUMN, keep='first')
+
+
+class HybridDedup:
+    # Peta pemenang per key dibagi ke beberapa partisi hash. Jika estimasi memori melewati budget,
+    # partisi terbesar ditulis ke disk dan baris berikutnya untuk partisi itu langsung di-append ke file.
+    # Partisi di disk diproses ulang satu per satu di akhir (rekursif dengan salt hash berbeda).
+    # Tiap partisi di memori = pemenang hasil compact terakhir + chunk tereduksi yang belum di-merge;
+    # compact (concat + sort) baru dilakukan jika buffer sudah sebesar hasil compact terakhir,
+    # jadi biaya merge teramortisasi dan tidak tumbuh dengan jumlah chunk x ukuran peta.
+    def __init__(self, budget_bytes, partitions, spill_dir, salt=0):
+        self.budget_bytes = budget_bytes
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.salt = salt
+        self.maps = [None] * partitions
+        self.sizes = [0] * partitions
+        self.compacted = [0] * partitions
+        self.spill_paths = [None] * partitions
+        self.row_bytes = None
+
+    def partition_of(self, keys):
+        hashed = pd.util.hash_pandas_object(keys, index=False, hash_key=f"dedup{self.salt:011d}")
+        return (hashed % self.partitions).to_numpy()
+
+    def memory_bytes(self):
+        return sum(self.sizes) * (self.row_bytes or 0)
+
+    def compact(self, part):
+        best = reduce_best(pd.concat(self.maps[part])) if len(self.maps[part]) > 1 else self.maps[part][0]
+        self.maps[part] = [best]
+        self.sizes[part] = self.compacted[part] = len(best)
+        return best
+
+    def spill(self, part):
+        path = os.path.join(self.spill_dir, f"part_{self.salt}_{part}.pkl")
+        with open(path, 'ab') as f:
+            pickle.dump(self.compact(part), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spill_paths[part] = path
+        self.maps[part] = None
+        self.sizes[part] = self.compacted[part] = 0
+
+    def add(self, chunk):
+        if self.row_bytes is None and len(chunk):
+            self.row_bytes = chunk.memory_usage(deep=True).sum() / len(chunk)
+        for part, rows in chunk.groupby(self.partition_of(chunk[KEY_COLUMN]), sort=False):
+            rows = reduce_best(rows)
+            if self.spill_paths[part] is not None:
+                with open(self.spill_paths[part], 'ab') as f:
+                    pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+                continue
+            if self.maps[part] is None:
+                self.maps[part] = []
+            self.maps[part].append(rows)
+            self.sizes[part] += len(rows)
+            if self.sizes[part] >= 2 * self.compacted[part]:
+                self.compact(part)
+        while self.memory_bytes() > self.budget_bytes:
+            in_memory = [(self.sizes[part], part) for part, best in enumerate(self.maps) if best is not None]
+            # Batas kedalaman supaya budget yang terlalu kecil tidak membuat spill tanpa akhir
+            if not in_memory or self.salt >= MAX_SPILL_DEPTH:
+                break
+            part = max(in_memory)[1]
+            print(f"Budget memori terlampaui, partisi {part} ({self.sizes[part]:,} baris) ditulis ke disk")
+            self.spill(part)
+
+    def results(self):
+        for part, best in enumerate(self.maps):
+            if best is not None:
+                yield self.compact(part)
+        self.maps = [None] * self.partitions
+        self.sizes = [0] * self.partitions
+        for path in self.spill_paths:
+            if path is None:
+                continue
+            nested = HybridDedup(self.budget_bytes, self.partitions, self.spill_dir, self.salt + 1)
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        nested.add(pickle.load(f))
+                    except EOFError:
+                        break
+            os.remove(path)
+            yield from nested.results()
+
+
+def dedup_file(input_file, output_file, per_day=False, chunk_size=None, budget_bytes=None, partitions=16, spill_dir=None):
+    classifier = get_classifier()
+    chunk_size = chunk_size or get_chunk_size()
+    spill_dir = tempfile.mkdtemp(prefix='unique_spill_', dir=spill_dir)
+    dedup = HybridDedup(budget_bytes, partitions, spill_dir)
+    progress = ProgressReporter(f"[{os.path.basename(input_file)}] Dibaca: ")
+    row_offset = 0
+    try:
+        for chunk in pd.read_csv(input_file, delimiter='~', dtype=str, chunksize=chunk_size):
+            chunk = classifier.add_priority(chunk)
+            chunk['SERVICE_DETAIL'] = chunk['SERVICE_DETAIL'].astype(object)
+            chunk[ROW_COLUMN] = range(row_offset, row_offset + len(chunk))
+            key = chunk['msisdn'].fillna('')
+            if per_day:
+                # update_stamp berformat 'YYYY-MM-DD HH:MM:SS', 10 karakter pertama = tanggal
+                key = key + '|' + chunk['update_stamp'].fillna('').str[:10]
+            chunk[KEY_COLUMN] = key
+            dedup.add(chunk)
+            row_offset += len(chunk)
+            progress.update(len(chunk))
+        progress.done()
+
+        written = 0
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            for best in dedup.results():
+                best.drop(columns=[ROW_COLUMN, KEY_COLUMN]).to_csv(f, sep='~', index=False, header=written == 0)
+                written += len(best)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return row_offset, written
+
+
+if __name__ == "__main__":
+    args = get_positional_args()
+    input_file = args[0] if args else DEFAULT_INPUT
+    output_file = get_option("output", DEFAULT_OUTPUT)
+    per_day = has_flag("per-day")
+    memory_mb = get_option("memory-mb", float(os.getenv("UNIQUE_MEMORY_MB", 1024)), float)
+
+    total, written = dedup_file(
+        input_file, output_file, per_day=per_day,
+        budget_bytes=int(memory_mb * 1024 * 1024),
+        partitions=get_option("partitions", 16, int),
+        spill_dir=get_option("spill-dir", os.getenv("UNIQUE_SPILL_DIR")),
+    )
+    print(f"✅ {written:,} baris unik dari {total:,} baris ({'msisdn + tanggal' if per_day else 'msisdn'})")
+    print(f"✅ File berhasil disimpan sebagai: {output_file}")
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB")
@@ -0,0 +1,68 @@
+import re
+import sqlite3
+
+# Pengganti koneksi mysql-connector di atas SQLite untuk test: hanya sintaks MySQL yang dipakai
+# jalur unique pandas yang diterjemahkan (placeholder, temporary table, <=>, DELETE ... JOIN, TRUNCATE).
+
+DELETE_JOIN = re.compile(r"DELETE (\w+) FROM (\w+) \1\s+JOIN (\w+) (\w+) ON (.*)", re.S)
+
+
+def to_sqlite(query):
+    query = query.replace("%s", "?").replace("<=>", " IS ")
+    query = re.sub(r"CREATE TEMPORARY TABLE (\w+) SELECT", r"CREATE TEMP TABLE \1 AS SELECT", query)
+    query = query.replace("DROP TEMPORARY TABLE", "DROP TABLE")
+    query = re.sub(r"TRUNCATE TABLE (\w+)", r"DELETE FROM \1", query)
+    match = DELETE_JOIN.search(query)
+    if match:
+        alias, table, join_table, join_alias, condition = match.groups()
+        condition = condition.replace(f"{alias}.", f"{table}.")
+        query = f"DELETE FROM {table} WHERE EXISTS (SELECT 1 FROM {join_table} {join_alias} WHERE {condition})"
+    return query
+
+
+class StandInCursor:
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+
+    @property
+    def column_names(self):
+        return [col[0] for col in self.cursor.description]
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def execute(self, query, params=None):
+        self.cursor.execute(to_sqlite(query), params or ())
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(to_sqlite(query), list(rows))
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, path=':memory:'):
+        self.conn = sqlite3.connect(path)
+
+    def cursor(self, buffered=None, dictionary=False):
+        return StandInCursor(self.conn)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from benchmark_import import generate_interaction_file
+from priority_classifier import get_classifier
+from tes import dedup_file
+
+
+def reference(input_file, per_day):
+    # Versi in-memory: sort (PRIORITY, urutan baris) lalu drop_duplicates per key
+    df = get_classifier().add_priority(pd.read_csv(input_file, delimiter='~', dtype=str))
+    df['SERVICE_DETAIL'] = df['SERVICE_DETAIL'].astype(object)
+    key = df['msisdn'].fillna('')
+    if per_day:
+        key = key + '|' + df['update_stamp'].fillna('').str[:10]
+    df = df.assign(_key=key).sort_values('PRIORITY', kind='stable')
+    return df.drop_duplicates('_key').drop(columns='_key')
+
+
+def normalized(df):
+    df = df.astype(str)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def input_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dedup') / 'interaction.txt'
+    generate_interaction_file(str(path), rows=20000, msisdn_ratio=0.3, seed=11)
+    return str(path)
+
+
+@pytest.mark.parametrize('per_day', [False, True])
+@pytest.mark.parametrize('budget_bytes', [1 << 30, 2_000_000], ids=['in-memory', 'spill'])
+def test_dedup_matches_in_memory_reference(input_file, tmp_path, capsys, per_day, budget_bytes):
+    output_file = tmp_path / 'unique.txt'
+    total, written = dedup_file(input_file, str(output_file), per_day=per_day, chunk_size=1500,
+                                budget_bytes=budget_bytes, partitions=4, spill_dir=str(tmp_path))
+    spilled = 'ditulis ke disk' in capsys.readouterr().out
+    assert spilled == (budget_bytes < 1 << 30)
+
+    expected = reference(input_file, per_day)
+    result = pd.read_csv(output_file, delimiter='~', dtype=str)
+    assert total == 20000 and written == len(expected)
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected[result.columns]))
@@ -0,0 +1,61 @@
+import pandas as pd
+from benchmark_import import create_sqlite_tables, generate_interaction_file
+from grapari_cache import GrapariCache, normalize_key
+from interaction_schema import read_dtypes
+from interaction_transform import insert_columns, to_insert_frame, transform_interactions
+from sqlite_standin import StandInConnection
+from unique_interaction import get_last_id, rebuild_unique_pandas, update_unique_pandas
+
+TABLE = "ccap_t_interaction_test"
+UNIQUE_TABLE = "ccap_t_interaction_unique_test"
+# Kecil supaya insert key dan pemenang terpecah ke banyak batch
+BATCH_SIZE = 97
+
+
+def load_rows(tmp_path, rows=3000):
+    path = tmp_path / "interaction.txt"
+    units = generate_interaction_file(str(path), rows=rows, msisdn_ratio=0.1, seed=7)
+    cache = GrapariCache(ttl=0)
+    cache.mapping = {normalize_key(name): f"GRAPARI {i:03d}" for i, name in enumerate(units)}
+    df, _ = transform_interactions(pd.read_csv(path, delimiter='~', dtype=read_dtypes()), cache, 5, 2025)
+    return list(to_insert_frame(df).itertuples(index=False, name=None))
+
+
+def insert_rows(conn, rows):
+    query = f"INSERT INTO {TABLE} ({', '.join(insert_columns)}) VALUES ({', '.join(['%s'] * len(insert_columns))})"
+    cursor = conn.cursor()
+    cursor.executemany(query, rows)
+    conn.commit()
+    cursor.close()
+
+
+def unique_contents(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(insert_columns)} FROM {UNIQUE_TABLE}")
+    rows = sorted(cursor.fetchall(), key=repr)
+    cursor.close()
+    return rows
+
+
+def test_incremental_equals_full_rebuild(tmp_path):
+    rows = load_rows(tmp_path)
+    split = len(rows) // 3
+
+    incremental = StandInConnection()
+    create_sqlite_tables(incremental.conn, TABLE, UNIQUE_TABLE)
+    insert_rows(incremental, rows[:split])
+    rebuild_unique_pandas(incremental, TABLE, UNIQUE_TABLE, BATCH_SIZE)
+    # Dua file berikutnya masuk sebagai update incremental terpisah
+    for part in (rows[split:2 * split], rows[2 * split:]):
+        last_id = get_last_id(incremental, TABLE)
+        insert_rows(incremental, part)
+        update_unique_pandas(incremental, TABLE, UNIQUE_TABLE, last_id, BATCH_SIZE)
+
+    full = StandInConnection()
+    create_sqlite_tables(full.conn, TABLE, UNIQUE_TABLE)
+    insert_rows(full, rows)
+    rebuild_unique_pandas(full, TABLE, UNIQUE_TABLE, BATCH_SIZE)
+
+    expected = unique_contents(full)
+    assert len(expected) > 0
+    assert unique_contents(incremental) == expected
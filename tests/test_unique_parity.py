@@ -0,0 +1,95 @@
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from priority_classifier import get_classifier
+from unique_interaction import PRIORITY_TABLE, SERVICE_DETAIL_TABLE, add_priority, ranked_interactions_sql, select_unique
+
+# Parity pemenang unique: select_unique(add_priority(...)) vs prioritized_sql/ranked_interactions_sql.
+# SQL MySQL dijalankan di SQLite dengan penyesuaian dialek minimal (REGEXP_SUBSTR, LEFT, CAST AS BINARY).
+
+TOPIC_P44 = 'P44-Permintaan pembayaran tagihan'
+TOPIC_P1 = 'P11-Permintaan Pasang Baru Telkomsel Halo'
+
+# (id, msisdn, update_stamp, topic_result, service)
+ROWS = [
+    # prioritas terkecil menang: P1 (1) < P44 dari topik (2) < K (5)
+    (1, '628111', '2025-05-01 08:00:00', 'lainnya', 'K12-Keluhan'),
+    (2, '628111', '2025-05-01 09:00:00', TOPIC_P44, 'O1-Other'),
+    (3, '628111', '2025-05-01 23:59:59', 'lainnya', 'P1-Pasang'),
+    # prioritas sama (P2): id terkecil menang walau urutan baris terbalik
+    (5, '628111', '2025-05-02 07:00:00', 'lainnya', 'P2-b'),
+    (4, '628111', '2025-05-02 10:00:00', 'lainnya', 'P2-a'),
+    # service kosong (NaN), 'EMPTY' dan huruf kecil jatuh ke default_priority; seri -> id terkecil
+    (7, '628222', '2025-05-01 08:00:00', None, 'EMPTY'),
+    (6, '628222', '2025-05-01 09:00:00', None, None),
+    (8, '628222', '2025-05-01 10:00:00', 'lainnya', 'p1-huruf kecil'),
+    # fallback prefix: P77 tidak ada -> 'P' (4), I3 -> 'I' (7), Z9 -> default
+    (9, '628222', '2025-05-02 08:00:00', None, None),
+    (10, '628222', '2025-05-02 08:00:00', 'lainnya', 'Z9-foo'),
+    (12, '628222', '2025-05-02 08:00:00', 'lainnya', 'I3-x'),
+    (11, '628222', '2025-05-02 09:00:00', 'lainnya', 'P77-foo'),
+    # topik yang ter-mapping menang dari service; seri P1 -> id terkecil
+    (14, '628333', '2025-05-01 08:00:00', 'lainnya', 'P1'),
+    (13, '628333', '2025-05-01 09:00:00', TOPIC_P1, 'EMPTY'),
+    # topik P44 (2) menimpa service P1 milik baris yang sama, jadi service P1 baris lain menang
+    (16, '628444', '2025-05-01 08:00:00', TOPIC_P44, 'P1'),
+    (17, '628444', '2025-05-01 09:00:00', 'lainnya', 'P1'),
+]
+EXPECTED_WINNERS = {3, 4, 6, 11, 13, 17}
+COLUMNS = ['id', 'msisdn', 'update_stamp', 'topic_result', 'service']
+
+
+def regexp_substr(value, pattern, position, occurrence, match_type):
+    if value is None:
+        return None
+    match = re.compile(pattern).search(value, position - 1)
+    return match.group(0) if match else None
+
+
+def to_sqlite(sql):
+    for mysql, sqlite in (("AS BINARY", "AS BLOB"), ("LEFT(p.priority_prefix, 1)", "SUBSTR(p.priority_prefix, 1, 1)")):
+        assert mysql in sql
+        sql = sql.replace(mysql, sqlite)
+    return sql
+
+
+@pytest.fixture
+def conn():
+    classifier = get_classifier()
+    conn = sqlite3.connect(':memory:')
+    conn.create_function('REGEXP_SUBSTR', 5, regexp_substr)
+    conn.execute("CREATE TABLE interactions (id INTEGER PRIMARY KEY, msisdn TEXT, update_stamp TEXT, topic_result TEXT, service TEXT)")
+    conn.executemany("INSERT INTO interactions VALUES (?, ?, ?, ?, ?)", ROWS)
+    conn.execute(f"CREATE TABLE {SERVICE_DETAIL_TABLE} (topic_result TEXT PRIMARY KEY, service_detail TEXT)")
+    conn.executemany(f"INSERT INTO {SERVICE_DETAIL_TABLE} VALUES (?, ?)", list(classifier.topic_to_service_detail.items()))
+    conn.execute(f"CREATE TABLE {PRIORITY_TABLE} (code TEXT PRIMARY KEY, priority INTEGER)")
+    conn.executemany(f"INSERT INTO {PRIORITY_TABLE} VALUES (?, ?)", list(classifier.priority_order.items()))
+    yield conn
+    conn.close()
+
+
+def pandas_winners():
+    df = pd.DataFrame(ROWS, columns=COLUMNS).replace({None: np.nan})
+    return set(select_unique(add_priority(df))['id'].tolist())
+
+
+def server_winners(conn):
+    sql = to_sqlite(ranked_interactions_sql('interactions'))
+    return {row[0] for row in conn.execute(f"SELECT id FROM ({sql}) ranked WHERE ranked.rn = 1")}
+
+
+def test_pandas_winners():
+    assert pandas_winners() == EXPECTED_WINNERS
+
+
+def test_server_side_winners(conn):
+    assert server_winners(conn) == EXPECTED_WINNERS
+
+
+def test_priority_matches_server_side(conn):
+    df = add_priority(pd.DataFrame(ROWS, columns=COLUMNS).replace({None: np.nan}))
+    sql = to_sqlite(ranked_interactions_sql('interactions'))
+    server = dict(conn.execute(f"SELECT id, priority FROM ({sql}) ranked"))
+    assert dict(zip(df['id'].tolist(), df['PRIORITY'].astype(int).tolist())) == server
@@ -0,0 +1,311 @@
+import pandas as pd
+from batch_insert import insert_in_batches
+from import_metrics import timed
+from priority_classifier import get_classifier
+from interaction_schema import align_msisdn, memory_mb, read_interactions, to_db_rows
+
+SERVICE_DETAIL_TABLE = "ccap_m_topic_service_detail"
+PRIORITY_TABLE = "ccap_m_priority_order"
+HELPER_COLUMNS = ['id', 'SERVICE_DETAIL', 'PRIORITY', 'update_date']
+
+
+def add_priority(df_all):
+    # Mapping topic_result ke SERVICE_DETAIL (fallback ke 'service'), lalu PRIORITY dari prefix SERVICE_DETAIL.
+    # Aturannya ada di priority_rules.json (lihat priority_classifier) dan dihitung sekali per kategori,
+    # tujuannya untuk mengurutkan interaksi agar yang prioritas tinggi diproses lebih dulu saat pengambilan unique
+    return get_classifier().add_priority(df_all)
+
+
+def select_unique(df_all):
+    # Urutan stabil (PRIORITY lalu id) supaya pemenang untuk prioritas yang sama
+    # selalu baris yang paling awal masuk, sama seperti ORDER BY di mode server-side
+    df_sorted = df_all.sort_values(by=['PRIORITY', 'id'], kind='stable')
+    # update_date sebagai datetime64 (tengah malam), bukan objek date Python per baris
+    df_sorted['update_date'] = pd.to_datetime(df_sorted['update_stamp'], errors='coerce').dt.normalize()
+    # Ambil satu interaksi unik per msisdn per hari berdasarkan update_date
+    # Jika ingin hanya satu interaksi per msisdn per bulan, cukup gunakan subset=['msisdn']
+    return df_sorted.drop_duplicates(subset=['msisdn', 'update_date'], keep='first')
+
+
+def rebuild_unique_pandas(conn, table_interaction, unique_table, batch_size, metrics=None):
+    # Dibaca lewat cursor streaming langsung ke schema ringkas (kategori, int64, datetime64)
+    df_all = read_interactions(conn, f"SELECT * FROM {table_interaction}")
+    if df_all.empty:
+        return 0
+    cursor = conn.cursor()
+    try:
+        print("✅ Jumlah total baris awal:", len(df_all), f"({memory_mb(df_all):.1f} MB)")
+        # Hitung jumlah baris unik berdasarkan kombinasi msisdn dan tanggal (berarti bisa lebih dari 1 per bulan)
+        print("✅ Jumlah nilai msisdn unik (berdasarkan tanggal):", df_all['msisdn'].nunique())
+
+        with timed(metrics, "unique dedup", len(df_all)):
+            df_unique = select_unique(add_priority(df_all))
+
+        with timed(metrics, "unique insert", len(df_unique)):
+            cursor.execute(f"TRUNCATE TABLE {unique_table}")
+            conn.commit()
+            cols = [col for col in df_unique.columns if col not in HELPER_COLUMNS]
+            placeholders = ", ".join(["%s"] * len(cols))
+            insert_stmt = f"INSERT INTO {unique_table} ({', '.join(cols)}) VALUES ({placeholders})"
+
+            unique_rows = to_db_rows(df_unique, cols)
+            return insert_in_batches(conn, cursor, insert_stmt, unique_rows, batch_size, label=f"[{unique_table}] ")
+    finally:
+        cursor.close()
+
+
+def sync_priority_tables(conn):
+    # Tabel lookup kecil supaya SERVICE_DETAIL/PRIORITY bisa dihitung di MySQL.
+    # Kolom memakai collation biner agar pencocokan sama persis dengan dict Python.
+    classifier = get_classifier()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SERVICE_DETAIL_TABLE} (
+            topic_result VARCHAR(255) COLLATE utf8mb4_bin NOT NULL PRIMARY KEY,
+            service_detail VARCHAR(32) COLLATE utf8mb4_bin NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PRIORITY_TABLE} (
+            code VARCHAR(32) COLLATE utf8mb4_bin NOT NULL PRIMARY KEY,
+            priority INT NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute(f"DELETE FROM {SERVICE_DETAIL_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {SERVICE_DETAIL_TABLE} (topic_result, service_detail) VALUES (%s, %s)",
+            list(classifier.topic_to_service_detail.items())
+        )
+        cursor.execute(f"DELETE FROM {PRIORITY_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {PRIORITY_TABLE} (code, priority) VALUES (%s, %s)",
+            list(classifier.priority_order.items())
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def prioritized_sql(table, where=""):
+    # Padanan SQL dari add_priority:
+    #   SERVICE_DETAIL = mapping topic_result, fallback ke service
+    #   prefix         = ^[A-Z]+[0-9]* (case-sensitive, match_type 'c')
+    #   PRIORITY       = priority_order[prefix], lalu priority_order[huruf pertama], lalu default_priority
+    return f"""
+    SELECT p.*, COALESCE(po_exact.priority, po_first.priority, {int(get_classifier().default_priority)}) AS priority
+    FROM (
+        SELECT i.*, REGEXP_SUBSTR(COALESCE(sd.service_detail, i.service), '^[A-Z]+[0-9]*', 1, 1, 'c') AS priority_prefix
+        FROM {table} i
+        LEFT JOIN {SERVICE_DETAIL_TABLE} sd ON CAST(sd.topic_result AS BINARY) = CAST(i.topic_result AS BINARY)
+        {where}
+    ) p
+    LEFT JOIN {PRIORITY_TABLE} po_exact ON CAST(po_exact.code AS BINARY) = CAST(p.priority_prefix AS BINARY)
+    LEFT JOIN {PRIORITY_TABLE} po_first ON CAST(po_first.code AS BINARY) = CAST(LEFT(p.priority_prefix, 1) AS BINARY)
+    """
+
+
+def ranked_interactions_sql(table_interaction, where=""):
+    # Padanan SQL dari select_unique
+    return f"""
+    SELECT t.*, ROW_NUMBER() OVER (
+        PARTITION BY t.msisdn, DATE(t.update_stamp)
+        ORDER BY t.priority, t.id
+    ) AS rn
+    FROM ({prioritized_sql(table_interaction, where)}) t
+    """
+
+
+def get_unique_columns(conn, table_interaction):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table_interaction} LIMIT 0")
+        cursor.fetchall()
+        return [col for col in cursor.column_names if col not in HELPER_COLUMNS]
+    finally:
+        cursor.close()
+
+
+def rebuild_unique_server_side(conn, table_interaction, unique_table, metrics=None):
+    # Deduplikasi sepenuhnya di MySQL: tidak ada baris yang dikirim ke Python
+    sync_priority_tables(conn)
+    column_list = ", ".join(get_unique_columns(conn, table_interaction))
+    cursor = conn.cursor()
+    try:
+        # Dedup dan insert terjadi dalam satu statement, jadi dicatat sebagai satu stage
+        with timed(metrics, "unique dedup+insert") as record:
+            cursor.execute(f"TRUNCATE TABLE {unique_table}")
+            cursor.execute(f"""
+            INSERT INTO {unique_table} ({column_list})
+            SELECT {column_list} FROM ({ranked_interactions_sql(table_interaction)}) ranked
+            WHERE ranked.rn = 1
+            """)
+            inserted = cursor.rowcount
+            conn.commit()
+            record['rows'] = inserted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    print(f"[{unique_table}] {inserted} baris unik ditulis (server-side)")
+    return inserted
+
+
+def check_parity(conn, table_interaction):
+    # Bandingkan pemenang (id) hasil pandas dengan hasil ROW_NUMBER() di MySQL
+    sync_priority_tables(conn)
+    df_all = read_interactions(conn, f"SELECT * FROM {table_interaction}")
+    pandas_ids = set(select_unique(add_priority(df_all))['id'].tolist()) if not df_all.empty else set()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT id FROM ({ranked_interactions_sql(table_interaction)}) ranked WHERE ranked.rn = 1")
+        server_ids = {row['id'] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    only_pandas = pandas_ids - server_ids
+    only_server = server_ids - pandas_ids
+    if only_pandas or only_server:
+        print(f"❌ Parity {table_interaction} gagal: {len(only_pandas)} id hanya di pandas, {len(only_server)} id hanya di server-side")
+        print(f"   Contoh pandas: {sorted(only_pandas)[:10]} | server-side: {sorted(only_server)[:10]}")
+        return False
+    print(f"✅ Parity {table_interaction} cocok: {len(pandas_ids)} baris unik")
+    return True
+
+
+def get_last_id(conn, table_interaction):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_interaction}")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def is_table_empty(conn, table):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        return cursor.fetchone() is None
+    finally:
+        cursor.close()
+
+
+def to_key_rows(df):
+    keys = df[['msisdn', 'update_date']].copy()
+    keys['update_date'] = keys['update_date'].dt.date
+    return list(to_db_rows(keys, ['msisdn', 'update_date']))
+
+
+def insert_keys(cursor, df, batch_size):
+    # Dikirim per batch_size supaya multi-row INSERT tidak melewati max_allowed_packet
+    rows = to_key_rows(df)
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany("INSERT INTO tmp_unique_keys (msisdn, update_date) VALUES (%s, %s)", rows[start:start + batch_size])
+
+
+def update_unique_pandas(conn, table_interaction, unique_table, last_id, batch_size, metrics=None):
+    # Hanya key (msisdn, update_date) dari baris baru (id > last_id) yang dievaluasi ulang.
+    # Tabel interaksi hanya bertambah, jadi pemenang lama selalu punya id lebih kecil:
+    # baris baru hanya menggantikan pemenang lama jika PRIORITY-nya lebih tinggi.
+    new_rows = read_interactions(conn, f"SELECT * FROM {table_interaction} WHERE id > %s", (last_id,))
+    if new_rows.empty:
+        return 0
+    cursor = conn.cursor()
+    try:
+        with timed(metrics, "unique dedup", len(new_rows)):
+            candidates = select_unique(add_priority(new_rows))
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_unique_keys")
+        cursor.execute(f"CREATE TEMPORARY TABLE tmp_unique_keys SELECT msisdn, DATE(update_stamp) AS update_date FROM {unique_table} LIMIT 0")
+        insert_keys(cursor, candidates, batch_size)
+        current_rows = read_interactions(conn, f"""
+        SELECT u.* FROM {unique_table} u
+        JOIN tmp_unique_keys k ON u.msisdn <=> k.msisdn AND DATE(u.update_stamp) <=> k.update_date
+        """)
+
+        if not current_rows.empty:
+            current = select_unique(add_priority(current_rows.assign(id=0)))
+            candidates, current = align_msisdn(candidates, current)
+            merged = candidates.merge(
+                current[['msisdn', 'update_date', 'PRIORITY']], on=['msisdn', 'update_date'],
+                how='left', suffixes=('', '_current')
+            )
+            winners = merged[merged['PRIORITY_current'].isna() | (merged['PRIORITY'] < merged['PRIORITY_current'])]
+            winners = winners.drop(columns=['PRIORITY_current'])
+        else:
+            winners = candidates
+
+        cursor.execute("DELETE FROM tmp_unique_keys")
+        insert_keys(cursor, winners, batch_size)
+        cursor.execute(f"""
+        DELETE u FROM {unique_table} u
+        JOIN tmp_unique_keys k ON u.msisdn <=> k.msisdn AND DATE(u.update_stamp) <=> k.update_date
+        """)
+        replaced = cursor.rowcount
+
+        # DELETE + INSERT pemenang dalam satu transaksi supaya pembaca tidak melihat key yang hilang
+        cols = [col for col in winners.columns if col not in HELPER_COLUMNS]
+        placeholders = ", ".join(["%s"] * len(cols))
+        insert_stmt = f"INSERT INTO {unique_table} ({', '.join(cols)}) VALUES ({placeholders})"
+        winner_rows = list(to_db_rows(winners, cols))
+        with timed(metrics, "unique insert", len(winner_rows)):
+            for start in range(0, len(winner_rows), batch_size):
+                cursor.executemany(insert_stmt, winner_rows[start:start + batch_size])
+            conn.commit()
+        inserted = len(winner_rows)
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_unique_keys")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    print(f"[{unique_table}] Incremental: {len(candidates)} key dievaluasi, {inserted} pemenang ditulis ({replaced} menggantikan pemenang lama)")
+    return inserted
+
+
+def update_unique_server_side(conn, table_interaction, unique_table, last_id, metrics=None):
+    # Versi server-side dari update_unique_pandas
+    sync_priority_tables(conn)
+    column_list = ", ".join(get_unique_columns(conn, table_interaction))
+    cursor = conn.cursor()
+    try:
+        with timed(metrics, "unique dedup") as record:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_unique_candidates")
+            cursor.execute(f"""
+            CREATE TEMPORARY TABLE tmp_unique_candidates
+            SELECT ranked.* FROM ({ranked_interactions_sql(table_interaction, f"WHERE i.id > {int(last_id)}")}) ranked
+            WHERE ranked.rn = 1
+            """)
+            cursor.execute("SELECT COUNT(*) FROM tmp_unique_candidates")
+            evaluated = cursor.fetchone()[0]
+            record['rows'] = evaluated
+        # Buang kandidat yang tidak mengalahkan pemenang lama (prioritas sama: pemenang lama tetap)
+        cursor.execute(f"""
+        DELETE c FROM tmp_unique_candidates c
+        JOIN ({prioritized_sql(unique_table)}) cur
+            ON c.msisdn <=> cur.msisdn AND DATE(c.update_stamp) <=> DATE(cur.update_stamp)
+        WHERE cur.priority <= c.priority
+        """)
+        cursor.execute(f"""
+        DELETE u FROM {unique_table} u
+        JOIN tmp_unique_candidates c ON u.msisdn <=> c.msisdn AND DATE(u.update_stamp) <=> DATE(c.update_stamp)
+        """)
+        replaced = cursor.rowcount
+        with timed(metrics, "unique insert") as record:
+            cursor.execute(f"INSERT INTO {unique_table} ({column_list}) SELECT {column_list} FROM tmp_unique_candidates")
+            inserted = cursor.rowcount
+            conn.commit()
+            record['rows'] = inserted
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_unique_candidates")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    print(f"[{unique_table}] Incremental (server-side): {evaluated} key dievaluasi, {inserted} pemenang ditulis ({replaced} menggantikan pemenang lama)")
+    return inserted
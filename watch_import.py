@@ -0,0 +1,148 @@
+import os
+import signal
+import time
+from import_options import get_option, get_positional_args, has_flag, is_truncate
+from db_connection import get_connection, init_pool
+from grapari_cache import get_grapari_cache
+from parallel_import import list_txt_files
+from priority_classifier import get_classifier
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# Daemon import: proses tetap hidup, koneksi MySQL (pool), mapping grapari dan aturan prioritas
+# tetap hangat antar file. File baru di folder diimport begitu ukurannya stabil.
+#   python watch_import.py <bulan> <tahun> [--unique] [--bulk] [--poll-seconds N] [--settle-seconds N] [--watch-dir DIR]
+#   python watch_import.py --route-months [--create-tables] [--unique] ...
+
+
+class FolderWatcher:
+    def __init__(self, folder, poll_seconds=2.0, settle_seconds=3.0):
+        self.folder = folder
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.pending = {}
+        self.handled = {}
+        self.closed = set()
+        self.inotify = None
+        # File yang sudah ada sebelum watch dimulai tidak akan mendapat event, jadi memakai heuristik settle
+        self.existing = set()
+        if INotify is not None:
+            self.inotify = INotify()
+            self.inotify.add_watch(folder, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE)
+            self.existing = {path for path, _ in list_txt_files(folder)}
+        else:
+            print("inotify_simple tidak tersedia, memakai polling folder")
+
+    def wait(self):
+        # inotify: bangun begitu ada event (atau paling lama poll_seconds). Polling: tidur poll_seconds.
+        # CLOSE_WRITE/MOVED_TO menandakan penulis sudah selesai, file itu tidak perlu menunggu settle.
+        if self.inotify is None:
+            time.sleep(self.poll_seconds)
+            return
+        for event in self.inotify.read(timeout=int(self.poll_seconds * 1000)):
+            if event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO):
+                self.closed.add(os.path.join(self.folder, event.name))
+
+    def ready_files(self):
+        # Dengan inotify file baru hanya siap setelah CLOSE_WRITE/MOVED_TO (penulis yang macet tidak
+        # membuat file setengah jadi diimport). Tanpa inotify (dan untuk file yang sudah ada saat start)
+        # file dianggap lengkap jika ukuran dan mtime tidak berubah selama settle_seconds.
+        # File yang sudah ditangani diproses lagi hanya jika isinya berubah.
+        now = time.time()
+        ready = []
+        current = set()
+        for path, name in list_txt_files(self.folder):
+            current.add(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self.handled.get(path) == signature:
+                continue
+            if path in self.closed and stat.st_size > 0:
+                self.closed.discard(path)
+                ready.append((path, name, signature))
+                continue
+            if self.inotify is not None and path not in self.existing:
+                continue
+            seen = self.pending.get(path)
+            if seen is None or seen[0] != signature:
+                self.pending[path] = (signature, now)
+                continue
+            if stat.st_size > 0 and now - seen[1] >= self.settle_seconds:
+                ready.append((path, name, signature))
+        for path in set(self.pending) - current:
+            del self.pending[path]
+        for path in set(self.handled) - current:
+            del self.handled[path]
+        self.closed &= current
+        self.existing &= current
+        return ready
+
+    def mark_handled(self, path, signature):
+        # Setelah ditangani, perubahan berikutnya pada file ini juga menunggu event inotify
+        self.pending.pop(path, None)
+        self.existing.discard(path)
+        self.handled[path] = signature
+
+
+def run_daemon(import_file, config, folder, poll_seconds, settle_seconds, **connect_kwargs):
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stop.append(True))
+
+    # Satu koneksi di pool dipakai ulang untuk semua file; cache dipanaskan sebelum file pertama
+    init_pool(config, 1, connect_kwargs)
+    conn = get_connection(config)
+    try:
+        get_grapari_cache(conn)
+    finally:
+        conn.close()
+    get_classifier()
+
+    watcher = FolderWatcher(folder, poll_seconds, settle_seconds)
+    print(f"Memantau {folder} (poll {poll_seconds} detik, file stabil {settle_seconds} detik). Ctrl+C untuk berhenti.")
+    while not stop:
+        for path, name, signature in watcher.ready_files():
+            if stop:
+                break
+            start = time.time()
+            try:
+                success = import_file(path, name)
+            except Exception as e:
+                print(f"File: [{name}] Gagal Import Txt: {e}")
+                success = False
+            # File yang gagal tidak dicoba terus-menerus; diproses lagi jika file diganti/diubah
+            watcher.mark_handled(path, signature)
+            status = "Sukses" if success else "Gagal"
+            print(f"File: [{name}] {status}, {time.time() - start:.1f} detik proses, {time.time() - signature[1]:.1f} detik sejak file selesai ditulis")
+        watcher.wait()
+    print("Daemon import berhenti.")
+
+
+if __name__ == "__main__":
+    route = has_flag("route-months")
+    if len(get_positional_args()) < 2 and not route:
+        raise ValueError("Usage: python watch_import.py <bulan> <tahun> [--unique] [--bulk] [--stream] [--server-side] [--poll-seconds N] [--settle-seconds N] [--watch-dir DIR] [--route-months] [--rollup]")
+    if is_truncate():
+        raise ValueError("truncate tidak didukung di mode daemon, jalankan import biasa untuk reload penuh")
+
+    if has_flag("unique"):
+        from auto_import_excel_interaction_unique import location_folder_txt, mysql_config, read_file_txt, route_file_txt
+    else:
+        from auto_import_excel_interaction import location_folder_txt, mysql_config, read_file_txt, route_file_txt
+
+    folder = get_option("watch-dir", location_folder_txt)
+    if not os.path.isdir(folder):
+        print(f"Directory {folder} does not exist.")
+    else:
+        run_daemon(
+            route_file_txt if route else read_file_txt, mysql_config, folder,
+            poll_seconds=get_option("poll-seconds", float(os.getenv("WATCH_POLL_SECONDS", 2)), float),
+            settle_seconds=get_option("settle-seconds", float(os.getenv("WATCH_SETTLE_SECONDS", 3)), float),
+            allow_local_infile=has_flag("bulk"),
+        )